@@ -1,8 +1,13 @@
 
 # -*- coding: utf-8 -*-
 import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
+import numpy as np
 import streamlit as st
 import pandas as pd
 
@@ -16,8 +21,10 @@ from db import (
     delete_all_pacientes, upsert_paciente_single, delete_paciente_by_key,
 
     # Catálogos
-    list_procedimento_tipos, set_procedimento_tipo_status, upsert_procedimento_tipo,
-    list_cirurgia_situacoes, set_cirurgia_situacao_status, upsert_cirurgia_situacao,
+    list_procedimento_tipos, upsert_procedimento_tipo, bulk_update_procedimento_tipos,
+    upsert_procedimento_tipos_bulk,
+    list_cirurgia_situacoes, upsert_cirurgia_situacao, bulk_update_cirurgia_situacoes,
+    get_next_ordem_and_id, list_procedimento_tipos_page, count_procedimento_tipos, busca_norm,
 
     # Cirurgias
     list_cirurgias, insert_or_update_cirurgia, delete_cirurgia,
@@ -27,7 +34,7 @@ from db import (
     delete_all_cirurgias, delete_all_catalogos, hard_reset_local_db,
 )
 from processing import process_uploaded_file
-from export import to_formatted_excel_by_hospital, to_formatted_excel_cirurgias
+from export import to_formatted_excel, to_formatted_excel_by_hospital, to_formatted_excel_cirurgias
 
 # --- GitHub sync (baixar/subir o .db) ---
 try:
@@ -81,6 +88,147 @@ def try_vacuum_safely():
             st.info("Não foi possível executar VACUUM agora.")
             st.exception(e)
 
+# ---------------------------
+# Upload do .db para o GitHub em segundo plano (single-flight por sessão)
+# ---------------------------
+@st.cache_resource
+def _gh_executor():
+    """Executor de 1 thread compartilhado: só faz o envio HTTP; estado e resultados ficam na sessão."""
+    return ThreadPoolExecutor(max_workers=1)
+
+def _snapshot_db() -> str:
+    """Cópia consistente do .db (API de backup do SQLite, inclui o WAL) feita na thread da UI."""
+    fd, snap_path = tempfile.mkstemp(prefix="upload_", suffix=".db")
+    os.close(fd)
+    src = sqlite3.connect(DB_PATH)
+    dst = sqlite3.connect(snap_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return snap_path
+
+def _upload_snapshot(snap_path: str, commit_msg: str, prev_sha) -> dict:
+    """Envia um snapshot (sem st.*, sem tocar no DB_PATH) e o apaga."""
+    try:
+        ok, new_sha, status, msg = upload_db_to_github(
+            owner=GH_OWNER,
+            repo=GH_REPO,
+            path_in_repo=GH_PATH_IN_REPO,
+            branch=GH_BRANCH,
+            local_db_path=snap_path,
+            commit_message=commit_msg,
+            prev_sha=prev_sha,
+            checkpoint=False,
+            _return_details=True
+        )
+        return {"ok": ok, "status": status, "msg": msg, "sha": new_sha, "commit_msg": commit_msg}
+    except Exception as e:
+        return {"ok": False, "status": None, "msg": str(e), "sha": None, "commit_msg": commit_msg}
+    finally:
+        try: os.unlink(snap_path)
+        except Exception: pass
+
+def _gh_upload_worker(slot: dict, snap_path: str, commit_msg: str, prev_sha):
+    """
+    Roda na thread do executor: envia o snapshot e, enquanto houver pedido pendente da mesma
+    sessão, envia o próximo em seguida (não depende de a sessão continuar aberta).
+    Em falha, descarta o pendente: o merge do 409 na UI usa o .db local, que já inclui tudo.
+    """
+    while True:
+        result = _upload_snapshot(snap_path, commit_msg, prev_sha)
+        with slot["lock"]:
+            nxt, slot["pending"] = slot["pending"], None
+            if nxt is not None and not result["ok"]:
+                try: os.unlink(nxt[0])
+                except Exception: pass
+                result["commit_msg"] = nxt[1]
+                nxt = None
+            slot["result"] = result
+            if nxt is None:
+                slot["future"] = None
+                return
+        prev_sha = result["sha"] or prev_sha
+        snap_path, commit_msg = nxt
+
+def _gh_upload_slot() -> dict:
+    """Estado do upload desta sessão (compartilhado só com a thread do executor)."""
+    if "gh_upload" not in st.session_state:
+        st.session_state["gh_upload"] = {"lock": threading.Lock(), "future": None, "pending": None, "result": None}
+    return st.session_state["gh_upload"]
+
+def _upload_db_background(commit_msg: str):
+    """VACUUM + snapshot na thread da UI e envio em segundo plano; pedidos durante um envio são coalescidos."""
+    if not (GITHUB_SYNC_AVAILABLE and GITHUB_TOKEN_OK):
+        return
+    try_vacuum_safely()
+    try:
+        snap_path = _snapshot_db()
+    except Exception as e:
+        st.error("Falha ao preparar o envio do banco para o GitHub.")
+        st.exception(e)
+        return
+    slot = _gh_upload_slot()
+    with slot["lock"]:
+        if slot["future"] is not None:
+            # Envio em voo: fica só o snapshot mais recente, enviado pela própria thread em seguida
+            if slot["pending"] is not None:
+                try: os.unlink(slot["pending"][0])
+                except Exception: pass
+            slot["pending"] = (snap_path, commit_msg)
+            st.caption("Sincronização com GitHub já em andamento; alterações serão enviadas em seguida.")
+            return
+        slot["future"] = _gh_executor().submit(
+            _gh_upload_worker, slot, snap_path, commit_msg, st.session_state.get("gh_sha")
+        )
+    st.caption("Sincronização com GitHub iniciada em segundo plano.")
+
+def _show_gh_upload_result():
+    """Exibe o resultado do upload em segundo plano desta sessão (uma vez); conflito 409 é mesclado aqui, na UI."""
+    slot = _gh_upload_slot()
+    with slot["lock"]:
+        result, slot["result"] = slot["result"], None
+        running = slot["future"] is not None
+        if result is not None and result["status"] == 409 and running:
+            # Outro envio já começou: o merge espera ele terminar
+            slot["result"], result = result, None
+
+    if result is not None:
+        if result["ok"]:
+            if result["sha"]:
+                st.session_state["gh_sha"] = result["sha"]
+            st.success("Sincronização automática com GitHub concluída.")
+        elif result["status"] == 409:
+            # Remoto mudou: baixa, mescla e reenvia na thread da UI (substitui o .db local)
+            with st.spinner("Conflito no GitHub: mesclando com a versão remota..."):
+                try:
+                    ok, status, msg = safe_upload_with_merge(
+                        owner=GH_OWNER,
+                        repo=GH_REPO,
+                        path_in_repo=GH_PATH_IN_REPO,
+                        branch=GH_BRANCH,
+                        local_db_path=DB_PATH,
+                        commit_message=result["commit_msg"],
+                        prev_sha=st.session_state.get("gh_sha"),
+                        _return_details=True
+                    )
+                except Exception as e:
+                    ok, status, msg = False, None, str(e)
+            st.cache_data.clear()
+            if ok:
+                new_sha = get_remote_sha(GH_OWNER, GH_REPO, GH_PATH_IN_REPO, GH_BRANCH)
+                if new_sha:
+                    st.session_state["gh_sha"] = new_sha
+                st.success("Sincronização com GitHub concluída após merge automático.")
+            else:
+                st.error(f"Falha ao sincronizar com GitHub (status={status}). {msg}")
+        else:
+            st.error(f"Falha ao sincronizar com GitHub (status={result['status']}). {result['msg']}")
+
+    if running:
+        st.caption("⏳ Sincronização com GitHub em andamento...")
+
 # =========================
 # Startup: baixar .db se não existir ou se parecer "vazio" (apenas schema)
 # =========================
@@ -270,6 +418,82 @@ def _process_file_cached(file_bytes: bytes, file_name: str, prestadores_lista: l
     df = process_uploaded_file(bio, prestadores_lista, hospital)
     return pd.DataFrame(df) if df is not None else pd.DataFrame()
 
+# -----------------------------------------------------------------
+# Cache dos catálogos (Tipos/Situações) — invalida pelo mtime do .db
+# -----------------------------------------------------------------
+CATALOG_COLS = ["id", "nome", "ativo", "ordem"]
+
+def _db_mtime() -> float:
+    """mtime do .db considerando também o -wal (onde ficam as escritas recentes em modo WAL)."""
+    mtimes = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            pass
+    return max(mtimes, default=0.0)
+
+@st.cache_data(ttl=300, max_entries=4, show_spinner=False)
+def load_tipos_df(db_mtime: float) -> pd.DataFrame:
+    return list_procedimento_tipos(only_active=False)
+
+@st.cache_data(ttl=300, max_entries=4, show_spinner=False)
+def load_sits_df(db_mtime: float) -> pd.DataFrame:
+    return list_cirurgia_situacoes(only_active=False)
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)
+def load_registros_prefill(db_mtime: float, hospital: str, ano, mes, prestadores: tuple) -> tuple:
+    """Candidatos da base para a Aba Cirurgias, reaproveitados entre reruns enquanto o .db não mudar."""
+    rows = find_registros_para_prefill(hospital, ano=ano, mes=mes, prestadores=list(prestadores))
+    return tuple(tuple(r) for r in rows)
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)
+def load_tipos_page(db_mtime: float, status, search: str, order_by: str, asc: bool,
+                    limit: int, offset: int) -> pd.DataFrame:
+    return list_procedimento_tipos_page(status, search, order_by, asc, limit, offset)
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)
+def count_tipos(db_mtime: float, status, search: str) -> int:
+    return count_procedimento_tipos(status, search)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _tipos_csv(df: pd.DataFrame) -> bytes:
+    """CSV da lista de Tipos escrito direto em bytes (sem str intermediária), cacheado pelo conteúdo."""
+    buf = BytesIO()
+    df.to_csv(buf, index=False, encoding="utf-8", lineterminator="\n")
+    return buf.getvalue()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_tipos_xlsx(df: pd.DataFrame) -> bytes:
+    """Excel da lista de Tipos (cacheado pelo conteúdo do DataFrame: só regera quando a visão muda)."""
+    return to_formatted_excel(df, sheet_name="Tipos").getvalue()
+
+def _catalog_df(df_loader, only_active: bool = False) -> pd.DataFrame:
+    """Catálogo (Tipos/Situações) a partir do loader cacheado; opcionalmente só os ativos."""
+    df = df_loader(_db_mtime())
+    return df[df["ativo"] == 1] if only_active else df
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _catalog_by_id(df: pd.DataFrame) -> dict:
+    """Índice {id: (nome, ativo, ordem)} do catálogo cacheado (NULL no banco chega como NaN -> 0)."""
+    return {
+        int(rid): (nome, 0 if pd.isna(ativo) else int(ativo), 0 if pd.isna(ordem) else int(ordem))
+        for rid, nome, ativo, ordem in df[CATALOG_COLS].itertuples(index=False, name=None)
+    }
+
+def _changed_catalog_rows(df_after: pd.DataFrame, before_by_id: dict) -> list:
+    """Retorna [(id, ativo, ordem), ...] apenas das linhas cujo ativo/ordem mudou no data_editor."""
+    changed = []
+    for rid, ativo, ordem in pd.DataFrame(df_after)[["id", "ativo", "ordem"]].itertuples(index=False, name=None):
+        old = before_by_id.get(int(rid))
+        if old is None:
+            continue
+        ativo = int(bool(ativo))
+        ordem = old[2] if pd.isna(ordem) else int(ordem)
+        if (ativo, ordem) != old[1:]:
+            changed.append((int(rid), ativo, ordem))
+    return changed
+
 # Diagnóstico rápido do arquivo .db
 with st.expander("🔎 Diagnóstico do arquivo .db (local)", expanded=False):
     exists = os.path.exists(DB_PATH)
@@ -653,10 +877,9 @@ with tabs[1]:
             st.caption(f"Último recarregamento: {ts}")
 
     # -------- Carregar catálogos (para dropdowns do grid) --------
-    tipos_rows = list_procedimento_tipos(only_active=True)
-    df_tipos_cat = pd.DataFrame(tipos_rows, columns=["id", "nome", "ativo", "ordem"]) if tipos_rows else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+    df_tipos_cat = _catalog_df(load_tipos_df, only_active=True)
     if not df_tipos_cat.empty:
-        df_tipos_cat = df_tipos_cat.sort_values(["ordem", "nome"], kind="mergesort")
+        df_tipos_cat = df_tipos_cat.sort_values(["ordem", "nome"], kind="stable")
         tipo_nome_list = df_tipos_cat["nome"].tolist()
         tipo_nome2id = dict(zip(df_tipos_cat["nome"], df_tipos_cat["id"]))  # nome -> id
         tipo_id2nome = dict(zip(df_tipos_cat["id"], df_tipos_cat["nome"]))  # id -> nome
@@ -665,10 +888,9 @@ with tabs[1]:
         tipo_nome2id = {}
         tipo_id2nome = {}
 
-    sits_rows = list_cirurgia_situacoes(only_active=True)
-    df_sits_cat = pd.DataFrame(sits_rows, columns=["id", "nome", "ativo", "ordem"]) if sits_rows else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+    df_sits_cat = _catalog_df(load_sits_df, only_active=True)
     if not df_sits_cat.empty:
-        df_sits_cat = df_sits_cat.sort_values(["ordem", "nome"], kind="mergesort")
+        df_sits_cat = df_sits_cat.sort_values(["ordem", "nome"], kind="stable")
         sit_nome_list = df_sits_cat["nome"].tolist()
         sit_nome2id = dict(zip(df_sits_cat["nome"], df_sits_cat["id"]))
         sit_id2nome = dict(zip(df_sits_cat["id"], df_sits_cat["nome"]))
@@ -749,11 +971,12 @@ with tabs[1]:
         df_cir["_old_data"] = df_cir["Data_Cirurgia"].astype(str)
 
         # ✅ Base de candidatos (ignora período se filtro de Situação estiver ativo)
-        base_rows = find_registros_para_prefill(
+        base_rows = load_registros_prefill(
+            _db_mtime(),
             hosp_cad,
-            ano=ano_base,
-            mes=mes_base,
-            prestadores=prestadores_lista_filtro
+            ano_base,
+            mes_base,
+            tuple(prestadores_lista_filtro or ()),
         )
         df_base = pd.DataFrame(base_rows, columns=["Hospital", "Data", "Atendimento", "Paciente", "Convenio", "Prestador"])
         if df_base.empty:
@@ -871,7 +1094,7 @@ with tabs[1]:
                     nome = (nome or "").strip()
                     return mapa.get(nome) if nome else None
 
-                for _, r in edited_df.iterrows():
+                for r in edited_df.to_dict("records"):
                     tipo_id = _nome_to_id(r.get("Tipo (nome)"), tipo_nome2id)
                     sit_id  = _nome_to_id(r.get("Situação (nome)"), sit_nome2id)
 
@@ -1120,82 +1343,31 @@ with tabs[1]:
 # ====================================================================================
 with tabs[2]:
     st.subheader("Catálogos de Tipos de Procedimento e Situações da Cirurgia")
+    _show_gh_upload_result()
 
     st.markdown("#### Tipos de Procedimento")
     colA, colB = st.columns([2, 1])
 
-    if "tipo_form_reset" not in st.session_state:
-        st.session_state["tipo_form_reset"] = 0
-    if "tipo_bulk_reset" not in st.session_state:
-        st.session_state["tipo_bulk_reset"] = 0
-
-    df_tipos_cached = st.session_state.get("df_tipos_cached")
-    if df_tipos_cached is None:
-        tipos_all = list_procedimento_tipos(only_active=False)
-        if tipos_all:
-            df_tipos_cached = pd.DataFrame(tipos_all, columns=["id", "nome", "ativo", "ordem"])
-        else:
-            df_tipos_cached = pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-        st.session_state["df_tipos_cached"] = df_tipos_cached
-
-    def _next_ordem_from_cache(df: pd.DataFrame) -> int:
-        if df.empty or "ordem" not in df.columns:
-            return 1
-        try:
-            return int(pd.to_numeric(df["ordem"], errors="coerce").max() or 0) + 1
-        except Exception:
-            return 1
-
-    next_tipo_ordem = _next_ordem_from_cache(df_tipos_cached)
+    st.session_state["_next_tipo_hints"] = get_next_ordem_and_id("procedimento_tipos")
+    next_tipo_ordem = st.session_state["_next_tipo_hints"][0]
 
-    def _upload_db_catalogo(commit_msg: str):
-        if GITHUB_SYNC_AVAILABLE and GITHUB_TOKEN_OK:
-            try:
-                try_vacuum_safely()
-                ok, status, msg = safe_upload_with_merge(
-                    owner=GH_OWNER,
-                    repo=GH_REPO,
-                    path_in_repo=GH_PATH_IN_REPO,
-                    branch=GH_BRANCH,
-                    local_db_path=DB_PATH,
-                    commit_message=commit_msg,
-                    prev_sha=st.session_state.get("gh_sha"),
-                    _return_details=True
-                )
-                if ok:
-                    new_sha = get_remote_sha(GH_OWNER, GH_REPO, GH_PATH_IN_REPO, GH_BRANCH)
-                    if new_sha:
-                        st.session_state["gh_sha"] = new_sha
-                    st.success("Sincronização automática com GitHub concluída.")
-                else:
-                    st.error(f"Falha ao sincronizar com GitHub (status={status}). {msg}")
-            except Exception as e:
-                st.error("Falha ao sincronizar com GitHub.")
-                st.exception(e)
-
-    def _save_tipo_and_reset():
+    def _save_tipo(tipo_nome: str, tipo_ordem: int, tipo_ativo: bool):
         try:
-            suffix = st.session_state["tipo_form_reset"]
-            tipo_nome = (st.session_state.get(f"tipo_nome_input_{suffix}") or "").strip()
+            tipo_nome = (tipo_nome or "").strip()
             if not tipo_nome:
                 st.warning("Informe um nome de Tipo antes de salvar.")
                 return
-            tipo_ordem = int(st.session_state.get(f"tipo_ordem_input_{suffix}", next_tipo_ordem))
-            tipo_ativo = bool(st.session_state.get(f"tipo_ativo_input_{suffix}", True))
 
             ensure_db_writable()
             tid = upsert_procedimento_tipo(tipo_nome, int(tipo_ativo), int(tipo_ordem))
-            st.cache_data.clear()
+            load_tipos_df.clear()
             st.success(f"Tipo salvo (id={tid}).")
 
-            tipos_all2 = list_procedimento_tipos(only_active=False)
-            df2 = pd.DataFrame(tipos_all2, columns=["id", "nome", "ativo", "ordem"]) if tipos_all2 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-            st.session_state["df_tipos_cached"] = df2
-
-            prox_id = (df2["id"].max() + 1) if not df2.empty else 1
+            st.session_state["_next_tipo_hints"] = get_next_ordem_and_id("procedimento_tipos")
+            prox_id = st.session_state["_next_tipo_hints"][1]
             st.info(f"Próximo ID previsto: {prox_id}")
 
-            _upload_db_catalogo("Atualiza catálogo de Tipos (salvar individual)")
+            _upload_db_background("Atualiza catálogo de Tipos (salvar individual)")
         except PermissionError as pe:
             st.error(f"Diretório/arquivo do DB não é gravável. Ajuste 'DB_DIR' ou permissões. Detalhe: {pe}")
         except Exception as e:
@@ -1205,70 +1377,62 @@ with tabs[2]:
             else:
                 st.error("Falha ao salvar tipo.")
                 st.exception(e)
-        finally:
-            st.session_state["tipo_form_reset"] += 1
 
     with colA:
-        suffix = st.session_state["tipo_form_reset"]
-        st.text_input("Novo tipo / atualizar por nome", placeholder="Ex.: Colecistectomia", key=f"tipo_nome_input_{suffix}")
-        st.number_input("Ordem (para ordenar listagem)", min_value=0, value=next_tipo_ordem, step=1, key=f"tipo_ordem_input_{suffix}")
-        st.checkbox("Ativo", value=True, key=f"tipo_ativo_input_{suffix}")
-        st.button("Salvar tipo de procedimento", on_click=_save_tipo_and_reset)
+        # Formulários: os widgets só disparam rerun no submit (e são limpos após salvar)
+        with st.form("form_tipo_single", clear_on_submit=True):
+            tipo_nome_in = st.text_input("Novo tipo / atualizar por nome", placeholder="Ex.: Colecistectomia")
+            tipo_ordem_in = st.number_input("Ordem (para ordenar listagem)", min_value=0, value=next_tipo_ordem, step=1)
+            tipo_ativo_in = st.checkbox("Ativo", value=True)
+            submitted_tipo = st.form_submit_button("Salvar tipo de procedimento")
+        if submitted_tipo:
+            _save_tipo(tipo_nome_in, int(tipo_ordem_in), bool(tipo_ativo_in))
 
         st.markdown("##### Cadastrar vários tipos (em lote)")
-        bulk_suffix = st.session_state["tipo_bulk_reset"]
-        st.caption("Informe um tipo por linha. Ex.: Consulta\nECG\nRaio-X")
-        st.text_area("Tipos (um por linha)", height=120, key=f"tipo_bulk_input_{bulk_suffix}")
-        st.number_input("Ordem inicial (auto-incrementa)", min_value=0, value=next_tipo_ordem, step=1, key=f"tipo_bulk_ordem_{bulk_suffix}")
-        st.checkbox("Ativo (padrão)", value=True, key=f"tipo_bulk_ativo_{bulk_suffix}")
 
-        def _save_tipos_bulk_and_reset():
+        def _save_tipos_bulk(raw_text: str, start_ordem: int, ativo_padrao: bool):
             try:
-                suffix = st.session_state["tipo_bulk_reset"]
-                raw_text = st.session_state.get(f"tipo_bulk_input_{suffix}", "") or ""
-                start_ordem = int(st.session_state.get(f"tipo_bulk_ordem_{suffix}", next_tipo_ordem))
-                ativo_padrao = bool(st.session_state.get(f"tipo_bulk_ativo_{suffix}", True))
-
-                linhas = [ln.strip() for ln in raw_text.splitlines()]
-                nomes = [ln for ln in linhas if ln]
+                raw_text = raw_text or ""
+
+                # Uma passada: strip + descarte de vazios + dedup por casefold (mantém a grafia/ordem da 1ª ocorrência)
+                vistos = {}
+                total = 0
+                for ln in raw_text.splitlines():
+                    nome = ln.strip()
+                    if nome:
+                        total += 1
+                        vistos.setdefault(nome.casefold(), nome)
+                nomes = list(vistos.values())
                 if not nomes:
                     st.warning("Nada a cadastrar: informe ao menos um nome de tipo.")
                     return
 
                 ensure_db_writable()
-                num_new, num_skip = 0, 0
-                vistos = set()
-                for i, nome in enumerate(nomes):
-                    if nome.lower() in vistos:
-                        num_skip += 1
-                        continue
-                    vistos.add(nome.lower())
-                    try:
-                        upsert_procedimento_tipo(nome, int(ativo_padrao), start_ordem + i)
-                        num_new += 1
-                    except Exception:
-                        num_skip += 1
+                num_new = upsert_procedimento_tipos_bulk(nomes, int(ativo_padrao), start_ordem)
+                num_skip = total - num_new
 
-                st.cache_data.clear()
-
-                tipos_all3 = list_procedimento_tipos(only_active=False)
-                df3 = pd.DataFrame(tipos_all3, columns=["id", "nome", "ativo", "ordem"]) if tipos_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-                st.session_state["df_tipos_cached"] = df3
+                load_tipos_df.clear()
+                st.session_state["_next_tipo_hints"] = get_next_ordem_and_id("procedimento_tipos")
 
                 st.success(f"Cadastro em lote concluído. Criados/atualizados: {num_new} | ignorados: {num_skip}")
-                prox_id = (df3["id"].max() + 1) if not df3.empty else 1
+                prox_id = st.session_state["_next_tipo_hints"][1]
                 st.info(f"Próximo ID previsto: {prox_id}")
 
-                _upload_db_catalogo("Atualiza catálogo de Tipos (cadastro em lote)")
+                _upload_db_background("Atualiza catálogo de Tipos (cadastro em lote)")
             except PermissionError as pe:
                 st.error(f"Diretório/arquivo do DB não é gravável. Ajuste 'DB_DIR' ou permissões. Detalhe: {pe}")
             except Exception as e:
                 st.error("Falha no cadastro em lote de tipos.")
                 st.exception(e)
-            finally:
-                st.session_state["tipo_bulk_reset"] += 1
 
-        st.button("Salvar tipos em lote", on_click=_save_tipos_bulk_and_reset)
+        with st.form("form_tipo_bulk", clear_on_submit=True):
+            st.caption("Informe um tipo por linha. Ex.: Consulta\nECG\nRaio-X")
+            bulk_text_in = st.text_area("Tipos (um por linha)", height=120)
+            bulk_ordem_in = st.number_input("Ordem inicial (auto-incrementa)", min_value=0, value=next_tipo_ordem, step=1)
+            bulk_ativo_in = st.checkbox("Ativo (padrão)", value=True)
+            submitted_bulk = st.form_submit_button("Salvar tipos em lote")
+        if submitted_bulk:
+            _save_tipos_bulk(bulk_text_in, int(bulk_ordem_in), bool(bulk_ativo_in))
 
     with colB:
         st.markdown("##### Ações rápidas (Tipos)")
@@ -1276,18 +1440,16 @@ with tabs[2]:
         with col_btn_tipos:
             if st.button("🔄 Recarregar catálogos de Tipos"):
                 try:
-                    tipos_allX = list_procedimento_tipos(only_active=False)
-                    dfX = pd.DataFrame(tipos_allX, columns=["id", "nome", "ativo", "ordem"]) if tipos_allX else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-                    st.session_state["df_tipos_cached"] = dfX
+                    load_tipos_df.clear()
                     st.success("Tipos recarregados com sucesso.")
                 except Exception as e:
                     st.error("Falha ao recarregar tipos.")
                     st.exception(e)
 
         try:
-            df_tipos = st.session_state.get("df_tipos_cached", pd.DataFrame(columns=["id", "nome", "ativo", "ordem"]))
+            df_tipos = _catalog_df(load_tipos_df)
             if not df_tipos.empty:
-                st.data_editor(
+                edited_tipos = st.data_editor(
                     df_tipos,
                     use_container_width=True,
                     column_config={
@@ -1300,21 +1462,22 @@ with tabs[2]:
                 )
                 if st.button("Aplicar alterações nos tipos"):
                     try:
-                        ensure_db_writable()
-                        for _, r in df_tipos.iterrows():
-                            set_procedimento_tipo_status(int(r["id"]), int(r["ativo"]))
-                        st.cache_data.clear()
+                        changed = _changed_catalog_rows(edited_tipos, _catalog_by_id(load_tipos_df(_db_mtime())))
+                        if not changed:
+                            st.info("Nenhuma alteração nos tipos para aplicar.")
+                        else:
+                            ensure_db_writable()
+                            n_upd = bulk_update_procedimento_tipos(changed)
+                            load_tipos_df.clear()
 
-                        st.success("Tipos atualizados.")
+                            st.success(f"Tipos atualizados: {n_upd}.")
 
-                        tipos_all3 = list_procedimento_tipos(only_active=False)
-                        df3 = pd.DataFrame(tipos_all3, columns=["id", "nome", "ativo", "ordem"]) if tipos_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-                        st.session_state["df_tipos_cached"] = df3
+                            st.session_state["_next_tipo_hints"] = get_next_ordem_and_id("procedimento_tipos")
 
-                        prox_id = (df3["id"].max() + 1) if not df3.empty else 1
-                        st.info(f"Próximo ID previsto: {prox_id}")
+                            prox_id = st.session_state["_next_tipo_hints"][1]
+                            st.info(f"Próximo ID previsto: {prox_id}")
 
-                        _upload_db_catalogo("Atualiza catálogo de Tipos (aplicar alterações)")
+                            _upload_db_background("Atualiza catálogo de Tipos (aplicar alterações)")
                     except PermissionError as pe:
                         st.error(f"Diretório/arquivo do DB não é gravável. Ajuste 'DB_DIR' ou permissões. Detalhe: {pe}")
                     except Exception as e:
@@ -1330,76 +1493,27 @@ with tabs[2]:
     st.markdown("#### Situações da Cirurgia")
     colC, colD = st.columns([2, 1])
 
-    if "sit_form_reset" not in st.session_state:
-        st.session_state["sit_form_reset"] = 0
+    st.session_state["_next_sit_hints"] = get_next_ordem_and_id("cirurgia_situacoes")
+    next_sit_ordem = st.session_state["_next_sit_hints"][0]
 
-    df_sits_cached = st.session_state.get("df_sits_cached")
-    if df_sits_cached is None:
-        sits_all = list_cirurgia_situacoes(only_active=False)
-        if sits_all:
-            df_sits_cached = pd.DataFrame(sits_all, columns=["id", "nome", "ativo", "ordem"])
-        else:
-            df_sits_cached = pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-        st.session_state["df_sits_cached"] = df_sits_cached
-
-    def _next_sit_ordem_from_cache(df: pd.DataFrame) -> int:
-        if df.empty or "ordem" not in df.columns:
-            return 1
+    def _save_sit(sit_nome: str, sit_ordem: int, sit_ativo: bool):
         try:
-            return int(pd.to_numeric(df["ordem"], errors="coerce").max() or 0) + 1
-        except Exception:
-            return 1
-
-    next_sit_ordem = _next_sit_ordem_from_cache(df_sits_cached)
-
-    def _upload_db_situacao(commit_msg: str):
-        if GITHUB_SYNC_AVAILABLE and GITHUB_TOKEN_OK:
-            try_vacuum_safely()
-            try:
-                ok, status, msg = safe_upload_with_merge(
-                    owner=GH_OWNER,
-                    repo=GH_REPO,
-                    path_in_repo=GH_PATH_IN_REPO,
-                    branch=GH_BRANCH,
-                    local_db_path=DB_PATH,
-                    commit_message=commit_msg,
-                    prev_sha=st.session_state.get("gh_sha"),
-                    _return_details=True
-                )
-                if ok:
-                    new_sha = get_remote_sha(GH_OWNER, GH_REPO, GH_PATH_IN_REPO, GH_BRANCH)
-                    if new_sha:
-                        st.session_state["gh_sha"] = new_sha
-                    st.success("Sincronização automática com GitHub concluída.")
-                else:
-                    st.error(f"Falha ao sincronizar com GitHub (status={status}). {msg}")
-            except Exception as e:
-                st.error("Falha ao sincronizar com GitHub.")
-                st.exception(e)
-
-    def _save_sit_and_reset():
-        try:
-            suffix = st.session_state["sit_form_reset"]
-            sit_nome = (st.session_state.get(f"sit_nome_input_{suffix}") or "").strip()
+            sit_nome = (sit_nome or "").strip()
             if not sit_nome:
                 st.warning("Informe um nome de Situação antes de salvar.")
                 return
-            sit_ordem = int(st.session_state.get(f"sit_ordem_input_{suffix}", next_sit_ordem))
-            sit_ativo = bool(st.session_state.get(f"sit_ativo_input_{suffix}", True))
 
             ensure_db_writable()
             sid = upsert_cirurgia_situacao(sit_nome, int(sit_ativo), int(sit_ordem))
-            st.cache_data.clear()
+            load_sits_df.clear()
             st.success(f"Situação salva (id={sid}).")
 
-            sits_all2 = list_cirurgia_situacoes(only_active=False)
-            df2 = pd.DataFrame(sits_all2, columns=["id", "nome", "ativo", "ordem"]) if sits_all2 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-            st.session_state["df_sits_cached"] = df2
+            st.session_state["_next_sit_hints"] = get_next_ordem_and_id("cirurgia_situacoes")
 
-            prox_id_s = (df2["id"].max() + 1) if not df2.empty else 1
+            prox_id_s = st.session_state["_next_sit_hints"][1]
             st.info(f"Próximo ID previsto: {prox_id_s}")
 
-            _upload_db_situacao("Atualiza catálogo de Situações (salvar individual)")
+            _upload_db_background("Atualiza catálogo de Situações (salvar individual)")
         except PermissionError as pe:
             st.error(f"Diretório/arquivo do DB não é gravável. Ajuste 'DB_DIR' ou permissões. Detalhe: {pe}")
         except Exception as e:
@@ -1409,15 +1523,15 @@ with tabs[2]:
             else:
                 st.error("Falha ao salvar situação.")
                 st.exception(e)
-        finally:
-            st.session_state["sit_form_reset"] += 1
 
     with colC:
-        suffix = st.session_state["sit_form_reset"]
-        st.text_input("Nova situação / atualizar por nome", placeholder="Ex.: Realizada, Cancelada, Adiada", key=f"sit_nome_input_{suffix}")
-        st.number_input("Ordem (para ordenar listagem)", min_value=0, value=next_sit_ordem, step=1, key=f"sit_ordem_input_{suffix}")
-        st.checkbox("Ativo", value=True, key=f"sit_ativo_input_{suffix}")
-        st.button("Salvar situação", on_click=_save_sit_and_reset)
+        with st.form("form_sit_single", clear_on_submit=True):
+            sit_nome_in = st.text_input("Nova situação / atualizar por nome", placeholder="Ex.: Realizada, Cancelada, Adiada")
+            sit_ordem_in = st.number_input("Ordem (para ordenar listagem)", min_value=0, value=next_sit_ordem, step=1)
+            sit_ativo_in = st.checkbox("Ativo", value=True)
+            submitted_sit = st.form_submit_button("Salvar situação")
+        if submitted_sit:
+            _save_sit(sit_nome_in, int(sit_ordem_in), bool(sit_ativo_in))
 
     with colD:
         st.markdown("##### Ações rápidas (Situações)")
@@ -1425,18 +1539,16 @@ with tabs[2]:
         with col_btn_sits:
             if st.button("🔄 Recarregar catálogos de Situações"):
                 try:
-                    sits_allX = list_cirurgia_situacoes(only_active=False)
-                    dfX = pd.DataFrame(sits_allX, columns=["id", "nome", "ativo", "ordem"]) if sits_allX else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-                    st.session_state["df_sits_cached"] = dfX
+                    load_sits_df.clear()
                     st.success("Situações recarregadas com sucesso.")
                 except Exception as e:
                     st.error("Falha ao recarregar situações.")
                     st.exception(e)
 
         try:
-            df_sits = st.session_state.get("df_sits_cached", pd.DataFrame(columns=["id", "nome", "ativo", "ordem"]))
+            df_sits = _catalog_df(load_sits_df)
             if not df_sits.empty:
-                st.data_editor(
+                edited_sits = st.data_editor(
                     df_sits,
                     use_container_width=True,
                     column_config={
@@ -1449,21 +1561,22 @@ with tabs[2]:
                 )
                 if st.button("Aplicar alterações nas situações"):
                     try:
-                        ensure_db_writable()
-                        for _, r in df_sits.iterrows():
-                            set_cirurgia_situacao_status(int(r["id"]), int(r["ativo"]))
-                        st.cache_data.clear()
+                        changed = _changed_catalog_rows(edited_sits, _catalog_by_id(load_sits_df(_db_mtime())))
+                        if not changed:
+                            st.info("Nenhuma alteração nas situações para aplicar.")
+                        else:
+                            ensure_db_writable()
+                            n_upd = bulk_update_cirurgia_situacoes(changed)
+                            load_sits_df.clear()
 
-                        st.success("Situações atualizadas.")
+                            st.success(f"Situações atualizadas: {n_upd}.")
 
-                        sits_all3 = list_cirurgia_situacoes(only_active=False)
-                        df3 = pd.DataFrame(sits_all3, columns=["id", "nome", "ativo", "ordem"]) if sits_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-                        st.session_state["df_sits_cached"] = df3
+                            st.session_state["_next_sit_hints"] = get_next_ordem_and_id("cirurgia_situacoes")
 
-                        prox_id_s = (df3["id"].max() + 1) if not df3.empty else 1
-                        st.info(f"Próximo ID previsto: {prox_id_s}")
+                            prox_id_s = st.session_state["_next_sit_hints"][1]
+                            st.info(f"Próximo ID previsto: {prox_id_s}")
 
-                        _upload_db_situacao("Atualiza catálogo de Situações (aplicar alterações)")
+                            _upload_db_background("Atualiza catálogo de Situações (aplicar alterações)")
                     except PermissionError as pe:
                         st.error(f"Diretório/arquivo do DB não é gravável. Ajuste 'DB_DIR' ou permissões. Detalhe: {pe}")
                     except Exception as e:
@@ -1482,14 +1595,6 @@ with tabs[3]:
     st.subheader("Lista de Tipos de Procedimento")
     st.caption("Visualize, filtre, busque, ordene e exporte todos os tipos (ativos e inativos).")
 
-    try:
-        tipos_all = list_procedimento_tipos(only_active=False)
-        df_tipos_full = pd.DataFrame(tipos_all, columns=["id", "nome", "ativo", "ordem"])
-    except Exception as e:
-        st.error("Erro ao carregar tipos do banco.")
-        st.exception(e)
-        df_tipos_full = pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
-
     colF1, colF2, colF3, colF4 = st.columns([1, 1, 1, 2])
     with colF1:
         filtro_status = st.selectbox("Status", options=["Todos", "Ativos", "Inativos"], index=0)
@@ -1500,64 +1605,82 @@ with tabs[3]:
     with colF4:
         busca_nome = st.text_input("Buscar por nome (contém)", value="", placeholder="Ex.: ECG, Consulta...")
 
-    df_view = df_tipos_full.copy()
-    if filtro_status == "Ativos":
-        df_view = df_view[df_view["ativo"] == 1]
-    elif filtro_status == "Inativos":
-        df_view = df_view[df_view["ativo"] == 0]
-    if busca_nome.strip():
-        termo = busca_nome.strip().lower()
-        df_view = df_view[df_view["nome"].astype(str).str.lower().str.contains(termo)]
-    df_view = df_view.sort_values(by=[ordenar_por], ascending=ordem_cresc, kind="mergesort")
-
     st.divider()
     st.markdown("#### Resultado")
-    total_rows = len(df_view)
-    per_page = st.number_input("Linhas por página", min_value=10, max_value=200, value=25, step=5)
-    max_page = max(1, (total_rows + per_page - 1) // per_page)
-    page = st.number_input("Página", min_value=1, max_value=max_page, value=1, step=1)
-    start, end = (page - 1) * per_page, (page - 1) * per_page + per_page
-    df_page = df_view.iloc[start:end].copy()
+    # Página vem direto do SQLite (filtro + ORDER BY + LIMIT/OFFSET); a visão completa fica só para exportar
+    status_sql = {"Ativos": 1, "Inativos": 0}.get(filtro_status)
+    try:
+        total_rows = count_tipos(_db_mtime(), status_sql, busca_nome.strip())
+    except Exception as e:
+        st.error("Erro ao contar tipos no banco.")
+        st.exception(e)
+        total_rows = 0
+    per_page = int(st.number_input("Linhas por página", min_value=10, max_value=200, value=25, step=5))
+    max_page = max(1, -(-total_rows // per_page))
+    page = int(st.number_input("Página", min_value=1, max_value=max_page, value=1, step=1))
+    start = (page - 1) * per_page
+    try:
+        df_page = load_tipos_page(_db_mtime(), status_sql, busca_nome.strip(), ordenar_por, ordem_cresc,
+                                  per_page, start)
+    except Exception as e:
+        st.error("Erro ao carregar a página de tipos.")
+        st.exception(e)
+        df_page = pd.DataFrame(columns=CATALOG_COLS)
     st.caption(f"Exibindo {len(df_page)} de {total_rows} registro(s) — página {page}/{max_page}")
     st.dataframe(df_page, use_container_width=True)
 
     st.markdown("#### Exportar")
-    colE1, colE2 = st.columns(2)
-    with colE1:
-        csv_bytes = df_view.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            label="⬇️ Baixar CSV (filtros aplicados)",
-            data=csv_bytes,
-            file_name="tipos_de_procedimento.csv",
-            mime="text/csv"
-        )
-    with colE2:
+    # Arquivos só são gerados sob demanda e para a combinação de filtros/DB em que foram preparados
+    export_sig = (filtro_status, busca_nome.strip(), ordenar_por, ordem_cresc, _db_mtime())
+    if st.button("Preparar arquivos (CSV/Excel)"):
+        st.session_state["tipos_export_sig"] = export_sig
+    if st.session_state.get("tipos_export_sig") != export_sig:
+        st.caption("Clique em **Preparar arquivos** para gerar o CSV/Excel com os filtros atuais.")
+    else:
         try:
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                df_view.to_excel(writer, sheet_name="Tipos", index=False)
-                wb = writer.book
-                ws = writer.sheets("Tipos") if hasattr(writer, "sheets") else writer.sheets["Tipos"]
-                header_fmt = wb.add_format({"bold": True, "bg_color": "#DCE6F1", "border": 1})
-                # Segurança: garante cabeçalho com formato
-                for col_num, value in enumerate(df_view.columns):
-                    ws.write(0, col_num, value, header_fmt)
-                last_row = max(len(df_view), 1)
-                ws.autofilter(0, 0, last_row, max(0, len(df_view.columns) - 1))
-                for i, col in enumerate(df_view.columns):
-                    values = [str(x) for x in df_view[col].tolist()]
-                    maxlen = max([len(str(col))] + [len(v) for v in values]) + 2
-                    ws.set_column(i, i, max(14, min(maxlen, 60)))
-            output.seek(0)
-            st.download_button(
-                label="⬇️ Baixar Excel (filtros aplicados)",
-                data=output.getvalue(),
-                file_name="tipos_de_procedimento.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            df_tipos_full = _catalog_df(load_tipos_df)
         except Exception as e:
-            st.error("Falha ao gerar Excel.")
+            st.error("Erro ao carregar tipos do banco.")
             st.exception(e)
+            df_tipos_full = pd.DataFrame(columns=CATALOG_COLS)
+
+        # Filtros combinados em uma única máscara (um só recorte do DataFrame)
+        mask = np.ones(len(df_tipos_full), dtype=bool)
+        if filtro_status == "Ativos":
+            mask &= df_tipos_full["ativo"].to_numpy() == 1
+        elif filtro_status == "Inativos":
+            mask &= df_tipos_full["ativo"].to_numpy() == 0
+        if busca_nome.strip():
+            # Mesmo predicado da listagem em SQL (busca_norm: casefold Unicode + 'contém' literal)
+            mask &= (
+                df_tipos_full["nome"].str.casefold()
+                .str.contains(busca_norm(busca_nome.strip()), regex=False, na=False).to_numpy()
+            )
+        df_view = df_tipos_full.loc[mask]
+        # O SQL já entrega ORDER BY ordem, nome: só reordena quando o usuário muda a ordenação padrão
+        if not (ordenar_por == "ordem" and ordem_cresc):
+            df_view = df_view.sort_values(by=[ordenar_por], ascending=ordem_cresc, kind="stable")
+
+        colE1, colE2 = st.columns(2)
+        with colE1:
+            csv_bytes = _tipos_csv(df_view)
+            st.download_button(
+                label="⬇️ Baixar CSV (filtros aplicados)",
+                data=csv_bytes,
+                file_name="tipos_de_procedimento.csv",
+                mime="text/csv"
+            )
+        with colE2:
+            try:
+                st.download_button(
+                    label="⬇️ Baixar Excel (filtros aplicados)",
+                    data=build_tipos_xlsx(df_view),
+                    file_name="tipos_de_procedimento.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            except Exception as e:
+                st.error("Falha ao gerar Excel.")
+                st.exception(e)
 
     with st.expander("ℹ️ Ajuda / Diagnóstico", expanded=False):
         st.markdown("""
@@ -1565,5 +1688,5 @@ with tabs[3]:
         - **Ordenação**: por padrão ordenamos por **ordem** e depois por **nome**.
         - **Busca**: digite parte do nome e pressione Enter.
         - **Paginação**: ajuste conforme necessário.
-        - **Exportar**: baixa exatamente o que está filtrado/ordenado.
+        - **Exportar**: clique em **Preparar arquivos** e baixe exatamente o que está filtrado/ordenado.
         """)
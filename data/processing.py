@@ -16,12 +16,32 @@ DATE_RE = re.compile(r"\b(\d{2}/\d{2}/\d{4})\b")
 HAS_LETTER_RE = re.compile(r"[A-Za-zÁÉÍÓÚÃÕÇáéíóúãõç]")
 SECTION_KEYWORDS = ["CENTRO CIRURGICO", "HEMODINAMICA", "CENTRO OBSTETRICO"]
 
+# Pré-filtros do parser (compilados uma vez; a varredura fica dentro do módulo re)
+ANY_TIME_RE = re.compile(r"\d{1,2}:\d{2}")
+AVISO_RE = re.compile(r"\d{3,}")
+ATENDIMENTO_RE = re.compile(r"\d{7,10}")
+HEADER_LINE_RE = re.compile(
+    "Hora|Atendimento|Paciente|Convênio|Prestador|Anestesista|Tipo Anestesia|Total|Página"
+)
+
 EXPECTED_COLS = [
     "Centro", "Data", "Atendimento", "Paciente", "Aviso",
     "Hora_Inicio", "Hora_Fim", "Cirurgia", "Convenio", "Prestador",
     "Anestesista", "Tipo_Anestesia", "Quarto"
 ]
 
+# Colunas de texto convertidas para string Arrow (buffer UTF-8 contíguo, sem PyObject por célula)
+TEXT_COLS = [
+    "Paciente", "Atendimento", "Aviso", "Cirurgia", "Prestador",
+    "Convenio", "Quarto", "Data", "Hora_Inicio", "Hora_Fim",
+]
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = "string"
+
 REQUIRED_COLS = [
     "Data", "Prestador", "Hora_Inicio",
     "Atendimento", "Paciente", "Aviso",
@@ -43,6 +63,10 @@ PROCEDURE_HINTS = {
     "LINFADENECTOMIA", "RECONSTRUÇÃO", "RETOSSIGMOIDECTOMIA", "PLEUROSCOPIA",
 }
 
+# Mesmos sinais em regex pré-compiladas (usadas nos kernels .str do pandas)
+PROCEDURE_RE = re.compile("|".join(map(re.escape, sorted(PROCEDURE_HINTS, key=len, reverse=True))))
+TECH_TEXT_RE = re.compile(r"[,/()%\-]|  ")
+
 def _is_probably_procedure_token(tok) -> bool:
     """
     Heurística para sinalizar que um token parece ser texto de procedimento (não paciente).
@@ -63,6 +87,32 @@ def _is_probably_procedure_token(tok) -> bool:
     return False
 
 
+def _blank_mask(series: pd.Series) -> pd.Series:
+    """True onde o valor é nulo ou só espaços."""
+    return series.isna() | series.astype(str).str.strip().eq("")
+
+
+# Marcas diacríticas combinantes (o que sobra de um acento após a decomposição NFKD)
+COMBINING_RE = re.compile("[\u0300-\u036f]")
+
+
+def _norm_upper_noacc(series: pd.Series) -> pd.Series:
+    """Versão vetorizada de strip_accents + strip + upper (nulos viram "")."""
+    return (
+        series.astype("string")
+        .str.normalize("NFKD")
+        .str.replace(COMBINING_RE, "", regex=True)
+        .str.strip()
+        .str.upper()
+        .fillna("")
+    )
+
+
+def _norm_blank(series: pd.Series) -> pd.Series:
+    """strip + upper com nulos -> "" numa única cadeia sobre string Arrow (trim/upper do Arrow compute)."""
+    return series.astype(TEXT_DTYPE).str.strip().str.upper().fillna("")
+
+
 def _strip_accents(s: str) -> str:
     """Remove acentos para comparações robustas (Prestador, etc.)."""
     if s is None or pd.isna(s):
@@ -138,8 +188,9 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
             continue
 
         # 1) Atualiza data SOMENTE em cabeçalho "Data de Realização" (prefix match), acento-insensível
-        line_noacc = _strip_accents(line).upper()
+        #    (remoção de acentos só nas linhas que podem ser cabeçalho de data/seção)
         m_date_hdr = DATE_RE.search(line)
+        line_noacc = _strip_accents(line).upper() if (m_date_hdr or "CENTRO" in line.upper()) else ""
         if ("DATA DE REALIZ" in line_noacc) and m_date_hdr:
             yyyy = int(m_date_hdr.group(1).split("/")[-1])
             if 2010 <= yyyy <= 2035:
@@ -159,14 +210,14 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
             continue
 
         # 3) Cabeçalho / rodapé / quebra de página
-        if any(h in line for h in [
-            "Hora", "Atendimento", "Paciente", "Convênio",
-            "Prestador", "Anestesista", "Tipo Anestesia",
-            "Total", "Total Geral", "Página"
-        ]):
+        if HEADER_LINE_RE.search(line):
             ctx["data_locked"] = False
             continue
 
+        # Sem nenhum horário na linha não há dado a extrair: evita tokenizar
+        if not ANY_TIME_RE.search(line):
+            continue
+
         # Tokeniza respeitando aspas
         tokens = next(csv.reader([line]))
         tokens = [t.strip() for t in tokens if t]
@@ -186,13 +237,13 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
 
         # 5) Aviso (código imediatamente antes do primeiro horário)
         aviso = None
-        if h0 - 1 >= 0 and re.fullmatch(r"\d{3,}", tokens[h0 - 1]):
+        if h0 - 1 >= 0 and AVISO_RE.fullmatch(tokens[h0 - 1]):
             aviso = tokens[h0 - 1]
 
         # 6) Atendimento explícito (7-10 dígitos)
         atendimento = None
         for t in tokens:
-            if re.fullmatch(r"\d{7,10}", t):
+            if ATENDIMENTO_RE.fullmatch(t):
                 atendimento = t
                 break
 
@@ -269,7 +320,7 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
 
 def _herdar_por_data_ordem_original(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Herança linha-a-linha por Data, preservando ordem original do arquivo.
+    Herança por Data, preservando ordem original do arquivo (vetorizada: groupby + ffill).
 
     Regras:
     - Aplica herança somente quando há Prestador na linha atual.
@@ -293,49 +344,90 @@ def _herdar_por_data_ordem_original(df: pd.DataFrame) -> pd.DataFrame:
     # Garante que Data exista em todas as linhas (apenas ffill)
     df["Data"] = df["Data"].ffill()
 
-    # Varre dia a dia na ordem original
-    for _, grp in df.groupby("Data", sort=False):
-        last_att = pd.NA
-        last_pac = pd.NA
-        last_aviso = pd.NA
-
-        for i in grp.sort_values("_row_idx").index:
-            att = df.at[i, "Atendimento"] if "Atendimento" in df.columns else pd.NA
-            pac = df.at[i, "Paciente"] if "Paciente" in df.columns else pd.NA
-            av  = df.at[i, "Aviso"] if "Aviso" in df.columns else pd.NA
-
-            # Atualiza memória com valores não vazios
-            if pd.notna(att) and str(att).strip():
-                last_att = att
-            if pd.notna(pac) and str(pac).strip():
-                last_pac = pac
-            if pd.notna(av) and str(av).strip():
-                last_aviso = av
-
-            # Herança só se houver Prestador na linha atual
-            has_prestador = (
-                "Prestador" in df.columns and
-                pd.notna(df.at[i, "Prestador"]) and
-                str(df.at[i, "Prestador"]).strip() != ""
-            )
-            if not has_prestador:
-                continue
-
-            # Atendimento: herda se vazio
-            if "Atendimento" in df.columns and (pd.isna(att) or str(att).strip() == "") and pd.notna(last_att):
-                df.at[i, "Atendimento"] = last_att
-
-            # Aviso: herda se vazio
-            if "Aviso" in df.columns and (pd.isna(av) or str(av).strip() == "") and pd.notna(last_aviso):
-                df.at[i, "Aviso"] = last_aviso
-
-            # Paciente: herda somente se last_pac não estiver vazio; senão mantém blank
-            if "Paciente" in df.columns and (pd.isna(pac) or str(pac).strip() == ""):
-                if pd.notna(last_pac) and str(last_pac).strip() != "":
-                    df.at[i, "Paciente"] = last_pac
-                else:
-                    df.at[i, "Paciente"] = pd.NA
+    # Herança só se houver Prestador na linha atual
+    if "Prestador" not in df.columns:
+        return df
+    has_prestador = ~_blank_mask(df["Prestador"])
+
+    # Ordem original do arquivo; groupby(...).ffill preserva essa ordem dentro de cada Data
+    order = df.sort_values("_row_idx", kind="mergesort").index
+    data_key = df.loc[order, "Data"]
+
+    for col in ("Atendimento", "Aviso", "Paciente"):
+        if col not in df.columns:
+            continue
+        vals = df.loc[order, col]
+        blank = _blank_mask(vals)
+        # Último valor não vazio conhecido no mesmo dia (inclui a própria linha)
+        last = vals.mask(blank).groupby(data_key, sort=False).ffill()
+
+        fill = blank & has_prestador.loc[order] & data_key.notna()
+        if col != "Paciente":
+            # Atendimento/Aviso: só herdam se houver valor anterior
+            fill &= last.notna()
+        # Paciente: herda o último não vazio; sem ele, fica em branco (NA)
+        idx = fill.index[fill.to_numpy()]
+        if len(idx):
+            df.loc[idx, col] = last.loc[idx]
+
+    return df
+
+
+# =========================
+# Leitura de CSV
+# =========================
+
+# Mesmos marcadores de nulo do parser C do pandas (na_values padrão)
+_NA_TEXT = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
 
+def _read_csv_fast(upload) -> pd.DataFrame:
+    """
+    CSV bem-formado via parser do PyArrow (C++ multithread). Todas as colunas do cabeçalho são
+    lidas como texto (sem a inferência do Arrow, que transformaria "08:30" em time32) e só depois
+    tipadas com a mesma regra do parser C (coluna 100% numérica -> int64/float64, resto texto),
+    para que Data/Hora_Inicio/ids mantenham o significado de antes.
+    Sem pyarrow instalado (ou se ele recusar o arquivo), repete com o parser C padrão.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        raw = upload.read()
+        header = next(csv.reader([raw.split(b"\n", 1)[0].decode("utf-8-sig").rstrip("\r")]))
+        table = pacsv.read_csv(
+            pa.BufferReader(raw),
+            parse_options=pacsv.ParseOptions(delimiter=",", newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={n: pa.string() for n in header},
+                null_values=_NA_TEXT,
+                strings_can_be_null=True,
+            ),
+        )
+        if table.num_columns != len(set(header)):
+            raise ValueError("cabeçalho com nomes repetidos")
+        df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    except Exception:
+        upload.seek(0)
+        return pd.read_csv(upload, sep=",", encoding="utf-8")
+
+    for c in df.columns:
+        col = df[c]
+        if col.isna().all():
+            df[c] = col.to_numpy(dtype="float64", na_value=np.nan) if len(col) else col
+            continue
+        try:
+            num = pd.to_numeric(col)
+        except (ValueError, TypeError):
+            df[c] = col  # texto (string Arrow, sem PyObject por célula)
+            continue
+        if pd.api.types.is_integer_dtype(num.dtype) and not num.isna().any():
+            df[c] = num.astype("int64")
+        else:
+            df[c] = num.to_numpy(dtype="float64", na_value=np.nan)
     return df
 
 
@@ -363,7 +455,7 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
         df_in = pd.read_excel(upload, engine="xlrd")
     elif name.endswith(".csv"):
         try:
-            df_in = pd.read_csv(upload, sep=",", encoding="utf-8")
+            df_in = _read_csv_fast(upload)
             # Se não tem colunas suficientes, parseia como texto bruto
             if len(set(EXPECTED_COLS) & set(df_in.columns)) < 6:
                 upload.seek(0)
@@ -388,62 +480,58 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
             # cria coluna vazia com alinhamento de índice
             df_in[c] = pd.NA
 
+    # Texto em object -> string Arrow (datas/números já tipados pelo leitor ficam como estão)
+    for c in TEXT_COLS:
+        if c in df_in.columns and df_in[c].dtype == object:
+            df_in[c] = df_in[c].astype(TEXT_DTYPE)
+
     # >>> Guarda os valores CRUS pré-herança (usados na dedup híbrida e para refletir o relatório)
     df_in["__pac_raw"]   = df_in["Paciente"]
     df_in["__att_raw"]   = df_in["Atendimento"]
     df_in["__aviso_raw"] = df_in["Aviso"]
 
-    # Sanitiza SOMENTE o __pac_raw (remove “paciente = cirurgia” / texto técnico)
-    def _sanitize_one(pac_val, cir_val):
-        pac = "" if pd.isna(pac_val) else str(pac_val).strip()
-        cir = "" if pd.isna(cir_val) else str(cir_val).strip()
-        if pac == "":
-            return pd.NA
-        if cir and pac.upper() == cir.upper():
-            return pd.NA
-        if _is_probably_procedure_token(pac):
-            return pd.NA
-        return pac
-
-    df_in["__pac_raw"] = [
-        _sanitize_one(p, c) for p, c in zip(
-            df_in["__pac_raw"],
-            df_in.get("Cirurgia", pd.Series(index=df_in.index))
-        )
-    ]
-
     # 2) Herança CONTROLADA (aplicada após salvar os CRUS)
     df = _herdar_por_data_ordem_original(df_in)
 
-    # 3) Filtro de prestadores (case-insensitive + remoção de acentos)
-    def norm(s):
-        s = "" if (s is None or pd.isna(s)) else str(s)
-        # remove acentos e normaliza
-        s = _strip_accents(s)
-        return s.strip().upper()
-
-    target = [norm(p) for p in prestadores_lista]  # inclua "CASSIO CESAR" na chamada
+    # 3) Filtro de prestadores (case-insensitive + remoção de acentos), vetorizado
+    target = set(_norm_upper_noacc(pd.Series(list(prestadores_lista), dtype="object")))  # inclua "CASSIO CESAR" na chamada
 
     # Garante coluna Prestador
     if "Prestador" not in df.columns:
         df["Prestador"] = pd.NA
 
-    df["Prestador_norm"] = df["Prestador"].apply(norm)
+    df["Prestador_norm"] = _norm_upper_noacc(df["Prestador"])
     df = df[df["Prestador_norm"].isin(target)].copy()
 
+    # 3.1) Sanitiza SOMENTE o __pac_raw (remove “paciente = cirurgia” / texto técnico), vetorizado.
+    #      Por linha, então roda só sobre as linhas dos prestadores alvo
+    pac = df["__pac_raw"].astype("string").str.strip()
+    cir = df.get("Cirurgia", pd.Series(pd.NA, index=df.index)).astype("string").str.strip()
+    pac_up = pac.str.upper()
+    bad = (
+        pac.isna()
+        | pac.eq("")
+        | (cir.notna() & cir.ne("") & pac_up.eq(cir.str.upper()))
+        | pac_up.str.contains(PROCEDURE_RE, na=False)
+        | pac.str.contains(TECH_TEXT_RE, na=False)
+        | pac.str.len().gt(50)
+    ).fillna(False).astype(bool)
+    df["__pac_raw"] = pac.mask(bad, pd.NA)
+
     # 4) start_key (ordenação temporal)
     hora_inicio = df["Hora_Inicio"] if "Hora_Inicio" in df.columns else pd.Series("", index=df.index)
     data_series = df["Data"] if "Data" in df.columns else pd.Series("", index=df.index)
+    # Concatena em string Arrow (sem Series object intermediária); cache=True faz cada
+    # "dd/mm/yyyy hh:mm" repetido ser convertido uma única vez
+    combined = data_series.astype(TEXT_DTYPE).fillna("") + " " + hora_inicio.astype(TEXT_DTYPE).fillna("")
     df["start_key"] = pd.to_datetime(
-        data_series.fillna("").astype(str) + " " + hora_inicio.fillna("").astype(str),
+        combined,
         format="%d/%m/%Y %H:%M",
-        errors="coerce"
+        errors="coerce",
+        cache=True,
     )
 
     # 4.1) DEDUP HÍBRIDA com VALORES CRUS (pré-herança) e regra PA/PV
-    def _norm_blank(series: pd.Series) -> pd.Series:
-        return series.fillna("").astype(str).str.strip().str.upper()
-
     P_raw  = _norm_blank(df["__pac_raw"])
     A_raw  = _norm_blank(df["__att_raw"])
     V_raw  = _norm_blank(df["__aviso_raw"])
@@ -451,31 +539,26 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
     PR     = df["Prestador_norm"].fillna("").astype(str)
 
     # Prioriza PA (Paciente+Atendimento), depois PV (Paciente+Aviso), depois P, A, V e T (tempo)
-    df["__dedup_tag"] = np.where((P_raw != "") & (A_raw != ""),
-        "PA|" + D + "|" + P_raw + "|" + A_raw + "|" + PR,
-        np.where((P_raw != "") & (V_raw != ""),
-            "PV|" + D + "|" + P_raw + "|" + V_raw + "|" + PR,
-            np.where(P_raw != "",
-                "P|"  + D + "|" + P_raw + "|" + PR,
-                np.where(A_raw != "",
-                    "A|" + D + "|" + A_raw + "|" + PR,
-                    np.where(V_raw != "",
-                        "V|" + D + "|" + V_raw + "|" + PR,
-                        "T|" + D + "|" + PR + "|" + df["start_key"].astype(str)
-                    )
-                )
-            )
-        )
-    )
-
-    df = df.sort_values(["Data", "Paciente", "Prestador_norm", "start_key"])
-    df = df.drop_duplicates(subset=["__dedup_tag"], keep="first")
+    has_p, has_a, has_v = (k.ne("").to_numpy(dtype=bool) for k in (P_raw, A_raw, V_raw))
+    conds = [has_p & has_a, has_p & has_v, has_p, has_a, has_v]
+    # Escolhe modo e chaves com np.select; a chave de dedup é um hash uint64 das partes (sem montar strings)
+    mode = np.select(conds, [0, 1, 2, 3, 4], default=5)
+    p_arr, a_arr, v_arr = (k.to_numpy(dtype=object) for k in (P_raw, A_raw, V_raw))
+    key1 = np.select(conds, [p_arr, p_arr, p_arr, a_arr, v_arr], default=df["start_key"].astype(str).to_numpy(dtype=object))
+    key2 = np.select(conds[:2], [a_arr, v_arr], default="")
+    helper = pd.DataFrame({"mode": mode, "D": D.to_numpy(), "k1": key1, "k2": key2, "PR": PR.to_numpy()},
+                          index=df.index)
+    df["__dedup_key"] = pd.util.hash_pandas_object(helper, index=False)
+
+    # Sem ordenar antes: o frame já está na ordem original do arquivo (_row_idx), então
+    # keep="first" fica com a primeira ocorrência do relatório; a única ordenação é a final
+    df = df.drop_duplicates(subset=["__dedup_key"], keep="first")
 
     # 🔧 Correção: usar o Paciente CRU (sanitizado) no resultado final (evita heranças indevidas)
     df["Paciente"] = df["__pac_raw"]
 
     # Limpeza de colunas técnicas
-    df = df.drop(columns=["__dedup_tag", "__pac_raw", "__att_raw", "__aviso_raw"], errors="ignore")
+    df = df.drop(columns=["__dedup_key", "__pac_raw", "__att_raw", "__aviso_raw"], errors="ignore")
 
     # 5) Hospital + Ano/Mes/Dia
     hosp = selected_hospital if (selected_hospital and not pd.isna(selected_hospital)) else ""
@@ -5,7 +5,7 @@ db.py — Camada de acesso ao SQLite (persistência do app)
 
 Principais recursos:
 - Caminho estável e gravável (DB_DIR via env -> ./data -> /tmp).
-- PRAGMAs úteis (FK, WAL, synchronous).
+- PRAGMAs úteis (FK, WAL, synchronous, cache/mmap) aplicados em cada conexão da engine.
 - VACUUM robusto (checkpoint + optimize) usando sqlite3 e dispose_engine() para evitar locks.
 - Índices únicos idempotentes para ON CONFLICT confiável.
 - Reset/Manutenção (hard_reset_local_db, vacuum, etc).
@@ -17,16 +17,27 @@ Principais recursos:
 from __future__ import annotations
 
 import os
-import math
+import re
+import functools
 import tempfile
 import sqlite3
-from typing import Dict, Any, Optional, Sequence, Tuple, List
+from typing import Dict, Any, Iterable, Optional, Sequence, Tuple, List
 from datetime import datetime
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
 
+from db_sql import DATA_INT_SQL  # mesma regra de _data_int_series em SQL (backfill / merge)
+
+# Cache da engine: st.cache_resource quando rodando no Streamlit (compartilha entre reruns/sessões);
+# fora dele (scripts, merge, testes), um lru_cache de 1 entrada.
+try:
+    import streamlit as _st
+    _cache_engine = _st.cache_resource(show_spinner=False)
+except Exception:
+    _cache_engine = functools.lru_cache(maxsize=1)
+
 # =============================================================================
 # CONFIGURAÇÃO DO BANCO (caminho gravável)
 # =============================================================================
@@ -47,8 +58,6 @@ if not DB_DIR:
 DB_PATH = os.path.join(DB_DIR, "exemplo.db")
 DB_URI = f"sqlite:///{DB_PATH}"
 
-_ENGINE: Optional[Engine] = None
-
 
 def ensure_db_writable() -> None:
     """Garante que o diretório e o arquivo do DB são graváveis; ajusta permissões quando possível."""
@@ -67,27 +76,46 @@ def ensure_db_writable() -> None:
             pass
 
 
+def busca_norm(s: Optional[str]) -> Optional[str]:
+    """Normalização da busca 'contém' (casefold Unicode); registrada no SQLite como busca_norm()."""
+    return None if s is None else str(s).casefold()
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+    """PRAGMAs aplicados a cada nova conexão DBAPI do pool (valem por conexão, exceto journal_mode)."""
+    # LIKE/lower() do SQLite só ignoram caixa em ASCII ('é' != 'É'): a busca usa a função Python
+    try:
+        dbapi_conn.create_function("busca_norm", 1, busca_norm, deterministic=True)
+    except Exception:  # SQLite antigo sem SQLITE_DETERMINISTIC
+        dbapi_conn.create_function("busca_norm", 1, busca_norm)
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")   # 256 MB
+        cur.execute("PRAGMA cache_size=-65536")     # 64 MB
+    finally:
+        cur.close()
+
+
+@_cache_engine
 def get_engine() -> Engine:
-    """Retorna (e cria se necessário) a engine do SQLAlchemy."""
-    global _ENGINE
-    if _ENGINE is None:
-        _ENGINE = create_engine(
-            DB_URI,
-            future=True,
-            echo=False,
-            connect_args={"check_same_thread": False},  # útil em Streamlit
-        )
-    return _ENGINE
+    """Retorna a engine do SQLAlchemy (criada uma única vez e mantida em cache)."""
+    eng = create_engine(
+        DB_URI,
+        future=True,
+        echo=False,
+        connect_args={"check_same_thread": False},  # útil em Streamlit
+    )
+    event.listen(eng, "connect", _set_sqlite_pragmas)
+    return eng
 
 
 def dispose_engine() -> None:
-    """Fecha e descarta a engine atual (útil para reset/manutenção)."""
-    global _ENGINE
-    if _ENGINE:
-        try:
-            _ENGINE.dispose()
-        finally:
-            _ENGINE = None
+    """Fecha as conexões do pool da engine (útil para reset/manutenção); a engine segue reutilizável."""
+    get_engine().dispose()
 
 
 # =============================================================================
@@ -95,27 +123,67 @@ def dispose_engine() -> None:
 # =============================================================================
 
 def _safe_int(v, default=0) -> int:
+    # Caminhos rápidos só para int e float exatos (NaN via v != v). bool, numpy e texto seguem a
+    # conversão por texto de sempre (bool -> "True" -> default, como antes)
+    t = type(v)
+    if t is int:
+        return v
+    if t is float:
+        try:
+            return default if v != v else int(v)
+        except Exception:  # inf
+            return default
     try:
         if v is None:
             return default
-        if isinstance(v, float) and math.isnan(v):
-            return default
         return int(float(str(v).strip()))
     except Exception:
         return default
 
 
 def _safe_str(v, default: str = "") -> str:
+    if type(v) is str:
+        return v.strip()
     if v is None:
         return default
-    try:
-        if isinstance(v, float) and math.isnan(v):
-            return default
-    except Exception:
-        pass
+    if isinstance(v, float) and v != v:
+        return default
     return str(v).strip()
 
 
+_DATA_BR_RE = re.compile(r"^(\d{2})/(\d{2})/(\d{4})")
+_DATA_ISO_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+
+
+def _data_int_series(ano: pd.Series, mes: pd.Series, dia: pd.Series, data: pd.Series) -> pd.Series:
+    """
+    Data canônica YYYYMMDD (para filtro por faixa indexado), vetorizada:
+    usa Ano/Mes/Dia (inteiros já limpos) ou, se ausentes, a Data em texto. Sem data válida -> None.
+    """
+    ymd = ano * 10000 + mes * 100 + dia
+    br = data.str.extract(_DATA_BR_RE)
+    iso = data.str.extract(_DATA_ISO_RE)
+    from_text = pd.to_numeric((br[2] + br[1] + br[0]).fillna(iso[0] + iso[1] + iso[2]), errors="coerce")
+    out = ymd.where((ano > 0) & (mes > 0) & (dia > 0), from_text)
+    # int nativo/None para o driver sqlite3 (a coluna vira float por causa dos NaN), numa conversão só
+    return out.astype("Int64").astype(object).where(out.notna(), None)
+
+
+# UPSERT ... RETURNING id (SQLite >= 3.35) evita o SELECT extra para recuperar o id
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _upsert_returning_id(conn, upsert_sql: str, params: dict, select_sql: str, select_params: dict) -> int:
+    """Executa o UPSERT e devolve o id da linha (RETURNING; em SQLite antigo, SELECT pela chave única)."""
+    if _HAS_RETURNING:
+        row = conn.execute(text(upsert_sql + " RETURNING id"), params).fetchone()
+    else:
+        conn.execute(text(upsert_sql), params)
+        row = conn.execute(text(select_sql), select_params).fetchone()
+    return int(row[0]) if row else 0
+
+
 # =============================================================================
 # GARANTIA DE ÍNDICES ÚNICOS
 # =============================================================================
@@ -137,19 +205,25 @@ def ensure_unique_indexes() -> None:
 
 
 # =============================================================================
-# INIT DB (com UNIQUE constraints + PRAGMAs)
+# INIT DB (com UNIQUE constraints)
 # =============================================================================
 
+# Versão do schema gravada em PRAGMA user_version; incremente ao alterar o DDL abaixo
+SCHEMA_VERSION = 1
+
+
 def init_db() -> None:
-    """Cria tabelas caso não existam e aplica índices únicos e PRAGMAs."""
+    """
+    Cria tabelas caso não existam e aplica índices únicos (PRAGMAs: ver _set_sqlite_pragmas).
+    Roda o DDL só quando o arquivo está numa versão de schema anterior a SCHEMA_VERSION.
+    """
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
     eng = get_engine()
-    with eng.begin() as conn:
-        # PRAGMAs úteis
-        conn.execute(text("PRAGMA foreign_keys=ON"))
-        conn.execute(text("PRAGMA journal_mode=WAL"))
-        conn.execute(text("PRAGMA synchronous=NORMAL"))
+    with eng.connect() as conn:
+        if int(conn.execute(text("PRAGMA user_version")).scalar() or 0) >= SCHEMA_VERSION:
+            return
 
+    with eng.begin() as conn:
         # Tabela base
         conn.execute(text("""
             CREATE TABLE IF NOT EXISTS pacientes_unicos_por_dia_prestador (
@@ -164,9 +238,23 @@ def init_db() -> None:
                 Convenio    TEXT,
                 Prestador   TEXT,
                 Quarto      TEXT,
+                Data_INT    INTEGER,
                 UNIQUE(Hospital, Atendimento, Paciente, Prestador, Data)
             );
         """))
+        # Bancos antigos: adiciona Data_INT (YYYYMMDD) e preenche a partir de Ano/Mes/Dia ou Data
+        cols_base = {r[1] for r in conn.execute(text("PRAGMA table_info(pacientes_unicos_por_dia_prestador)"))}
+        if "Data_INT" not in cols_base:
+            conn.execute(text("ALTER TABLE pacientes_unicos_por_dia_prestador ADD COLUMN Data_INT INTEGER"))
+        conn.execute(text(f"""
+            UPDATE pacientes_unicos_por_dia_prestador
+            SET Data_INT = {DATA_INT_SQL}
+            WHERE Data_INT IS NULL
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_hosp_dataint
+            ON pacientes_unicos_por_dia_prestador (Hospital, Data_INT);
+        """))
 
         # Cirurgias
         conn.execute(text("""
@@ -207,9 +295,22 @@ def init_db() -> None:
                 ordem INTEGER
             );
         """))
+        # Pré-preenchimento da Aba Cirurgias (Hospital + Prestador IN ...)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_base_hosp_prestador
+            ON pacientes_unicos_por_dia_prestador (Hospital, Prestador COLLATE NOCASE);
+        """))
+        # Listagem paginada de tipos (filtro por status + ORDER BY ordem, nome)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_proc_tipos_ativo
+            ON procedimento_tipos (ativo, ordem, nome);
+        """))
 
     ensure_unique_indexes()  # garante ON CONFLICT confiável
 
+    with eng.begin() as conn:
+        conn.execute(text(f"PRAGMA user_version = {int(SCHEMA_VERSION)}"))
+
 
 # =============================================================================
 # RESET / MANUTENÇÃO
@@ -342,12 +443,17 @@ def upsert_dataframe(df: pd.DataFrame) -> Tuple[int, int]:
     ensure_unique_indexes()
     ensure_db_writable()
 
-    # Normaliza colunas esperadas (defasadas viram vazias)
+    # Normaliza colunas esperadas (defasadas viram vazias) — uma passada vetorizada por coluna
     for col in ["Hospital", "Data", "Atendimento", "Paciente", "Aviso", "Convenio", "Prestador", "Quarto"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).fillna("").str.strip()
+            df[col] = df[col].fillna("").astype(str).str.strip()
         else:
             df[col] = ""
+    for col in ["Ano", "Mes", "Dia"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+        else:
+            df[col] = 0
 
     # Chave mínima: (Atendimento OU Paciente) + Hospital + Prestador + Data
     mask_key_missing = (df["Atendimento"] == "") & (df["Paciente"] == "")
@@ -357,32 +463,26 @@ def upsert_dataframe(df: pd.DataFrame) -> Tuple[int, int]:
     if df_valid.empty:
         return (0, ignoradas)
 
+    # Parâmetros de todas as linhas de uma vez (colunas já limpas + executemany: um único statement preparado)
+    cols = ["Hospital", "Ano", "Mes", "Dia", "Data", "Atendimento", "Paciente", "Aviso", "Convenio", "Prestador", "Quarto"]
+    clean = df_valid[cols].copy()
+    clean["Data_INT"] = _data_int_series(clean["Ano"], clean["Mes"], clean["Dia"], clean["Data"])
+    records = clean.to_dict("records")
+
     eng = get_engine()
     with eng.begin() as conn:
-        for _, r in df_valid.iterrows():
-            conn.execute(text("""
-                INSERT INTO pacientes_unicos_por_dia_prestador
-                (Hospital, Ano, Mes, Dia, Data, Atendimento, Paciente, Aviso, Convenio, Prestador, Quarto)
-                VALUES
-                (:Hospital, :Ano, :Mes, :Dia, :Data, :Atendimento, :Paciente, :Aviso, :Convenio, :Prestador, :Quarto)
-                ON CONFLICT(Hospital, Atendimento, Paciente, Prestador, Data)
-                DO UPDATE SET
-                    Aviso    = excluded.Aviso,
-                    Convenio = excluded.Convenio,
-                    Quarto   = excluded.Quarto
-            """), {
-                "Hospital": _safe_str(r.get("Hospital")),
-                "Ano": _safe_int(r.get("Ano")),
-                "Mes": _safe_int(r.get("Mes")),
-                "Dia": _safe_int(r.get("Dia")),
-                "Data": _safe_str(r.get("Data")),
-                "Atendimento": _safe_str(r.get("Atendimento")),
-                "Paciente": _safe_str(r.get("Paciente")),
-                "Aviso": _safe_str(r.get("Aviso")),
-                "Convenio": _safe_str(r.get("Convenio")),
-                "Prestador": _safe_str(r.get("Prestador")),
-                "Quarto": _safe_str(r.get("Quarto")),
-            })
+        conn.execute(text("""
+            INSERT INTO pacientes_unicos_por_dia_prestador
+            (Hospital, Ano, Mes, Dia, Data, Atendimento, Paciente, Aviso, Convenio, Prestador, Quarto, Data_INT)
+            VALUES
+            (:Hospital, :Ano, :Mes, :Dia, :Data, :Atendimento, :Paciente, :Aviso, :Convenio, :Prestador, :Quarto, :Data_INT)
+            ON CONFLICT(Hospital, Atendimento, Paciente, Prestador, Data)
+            DO UPDATE SET
+                Aviso    = excluded.Aviso,
+                Convenio = excluded.Convenio,
+                Quarto   = excluded.Quarto,
+                Data_INT = COALESCE(excluded.Data_INT, Data_INT)
+        """), records)
 
     return (len(df_valid), ignoradas)
 
@@ -458,24 +558,6 @@ def count_all() -> int:
 # LEITURAS P/ ABA CIRURGIAS (BASE)
 # =============================================================================
 
-def _date_filter_clause(colname: str, ano: Optional[int], mes: Optional[int]) -> Tuple[str, dict]:
-    """
-    Monta filtro por ano/mês tolerante a 'dd/MM/yyyy' ou 'YYYY-MM'.
-    """
-    params = {}
-    parts = []
-    if ano is not None and mes is not None:
-        parts.append(f"(({colname} LIKE :p1) OR ({colname} LIKE :p2))")
-        params["p1"] = f"%/{mes:02d}/{ano}"
-        params["p2"] = f"{ano}-{mes:02d}-%"
-    elif ano is not None:
-        parts.append(f"(({colname} LIKE :p3) OR ({colname} LIKE :p4))")
-        params["p3"] = f"%/{ano}"
-        params["p4"] = f"{ano}-%"
-    clause = (" AND " + " AND ".join(parts)) if parts else ""
-    return clause, params
-
-
 def find_registros_para_prefill(
     hospital: str,
     ano: Optional[int] = None,
@@ -492,11 +574,14 @@ def find_registros_para_prefill(
     where = ["Hospital = :h"]
     params = {"h": hospital}
 
-    # Filtro por Data (aceita 'dd/MM/yyyy' e 'YYYY-MM')
-    clause, p = _date_filter_clause("Data", ano, mes)
-    if clause:
-        where.append(clause[5:] if clause.startswith(" AND ") else clause)
-        params.update(p)
+    # Filtro por período via faixa em Data_INT (YYYYMMDD) — usa o índice (Hospital, Data_INT)
+    if ano is not None:
+        if mes is not None:
+            lo, hi = ano * 10000 + mes * 100 + 1, ano * 10000 + mes * 100 + 31
+        else:
+            lo, hi = ano * 10000 + 101, ano * 10000 + 1231
+        where.append("Data_INT BETWEEN :dlo AND :dhi")
+        params.update({"dlo": int(lo), "dhi": int(hi)})
 
     # Prestadores
     if prestadores:
@@ -508,7 +593,8 @@ def find_registros_para_prefill(
                 key = f"pp{i}"
                 in_params[key] = val
                 placeholders.append(f":{key}")
-            where.append(f"Prestador IN ({', '.join(placeholders)})")
+            # NOCASE: mesmo critério (sem diferenciar maiúsculas) do filtro de prestadores sobre cirurgias
+            where.append(f"Prestador COLLATE NOCASE IN ({', '.join(placeholders)})")
             params.update(in_params)
 
     sql = f"""
@@ -541,14 +627,83 @@ def list_registros_base_all(limit: int = 500) -> List[Tuple]:
 # CATÁLOGOS (Tipos e Situações)
 # =============================================================================
 
-def list_procedimento_tipos(only_active: bool = True) -> List[Tuple]:
+_NEXT_HINT_TABLES = ("procedimento_tipos", "cirurgia_situacoes")
+
+
+def get_next_ordem_and_id(table: str) -> Tuple[int, int]:
+    """
+    Retorna (próxima ordem, próximo id) do catálogo com um único SELECT de MAX
+    (resolvido pelo SQLite), sem carregar a tabela.
+    """
+    if table not in _NEXT_HINT_TABLES:
+        raise ValueError(f"Tabela de catálogo inválida: {table}")
+    eng = get_engine()
+    with eng.connect() as conn:
+        row = conn.execute(text(
+            f"SELECT COALESCE(MAX(ordem), 0) + 1, COALESCE(MAX(id), 0) + 1 FROM {table}"
+        )).fetchone()
+    return (int(row[0]), int(row[1])) if row else (1, 1)
+
+
+def list_procedimento_tipos(only_active: bool = True) -> pd.DataFrame:
+    """Catálogo como DataFrame (id, nome, ativo, ordem), lido direto do cursor via read_sql_query."""
     eng = get_engine()
     sql = "SELECT id, nome, ativo, ordem FROM procedimento_tipos"
     if only_active:
         sql += " WHERE ativo=1"
     sql += " ORDER BY ordem, nome"
     with eng.connect() as conn:
-        return conn.execute(text(sql)).fetchall()
+        return pd.read_sql_query(text(sql), conn)
+
+
+# Colunas permitidas no ORDER BY da listagem paginada (evita SQL injection)
+_TIPOS_ORDER_COLS = {"id": "id", "nome": "nome", "ativo": "ativo", "ordem": "ordem"}
+
+
+def _tipos_page_where(status: Optional[int], search: str) -> Tuple[str, dict]:
+    clauses, params = [], {}
+    if status is not None:
+        clauses.append("ativo = :status")
+        params["status"] = int(status)
+    search = _safe_str(search)
+    if search:
+        # 'contém' literal e sem caixa em Unicode; mesmo critério do filtro da exportação (app.py)
+        clauses.append("instr(busca_norm(nome), :q) > 0")
+        params["q"] = busca_norm(search)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def list_procedimento_tipos_page(
+    status: Optional[int] = None,
+    search: str = "",
+    order_by: str = "ordem",
+    asc: bool = True,
+    limit: int = 25,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """
+    Página da listagem de tipos com filtro (status/nome contém), ordenação e LIMIT/OFFSET no SQLite.
+    Empates seguem a ordem padrão (ordem, nome).
+    """
+    col = _TIPOS_ORDER_COLS.get(order_by, "ordem")
+    direction = "ASC" if asc else "DESC"
+    where, params = _tipos_page_where(status, search)
+    params.update({"l": int(limit), "o": int(offset)})
+    sql = (
+        f"SELECT id, nome, ativo, ordem FROM procedimento_tipos{where} "
+        f"ORDER BY {col} {direction}, ordem, nome LIMIT :l OFFSET :o"
+    )
+    eng = get_engine()
+    with eng.connect() as conn:
+        return pd.read_sql_query(text(sql), conn, params=params)
+
+
+def count_procedimento_tipos(status: Optional[int] = None, search: str = "") -> int:
+    """Total de tipos para os mesmos filtros de list_procedimento_tipos_page."""
+    where, params = _tipos_page_where(status, search)
+    eng = get_engine()
+    with eng.connect() as conn:
+        return int(conn.execute(text(f"SELECT COUNT(*) FROM procedimento_tipos{where}"), params).scalar() or 0)
 
 
 def upsert_procedimento_tipo(nome: str, ativo: int = 1, ordem: int = 1) -> int:
@@ -557,13 +712,17 @@ def upsert_procedimento_tipo(nome: str, ativo: int = 1, ordem: int = 1) -> int:
     eng = get_engine()
     nome = _safe_str(nome)
     with eng.begin() as conn:
-        conn.execute(text("""
+        return _upsert_returning_id(
+            conn,
+            """
             INSERT INTO procedimento_tipos (nome, ativo, ordem)
             VALUES (:nome, :ativo, :ordem)
             ON CONFLICT(nome) DO UPDATE SET ativo=excluded.ativo, ordem=excluded.ordem
-        """), {"nome": nome, "ativo": int(ativo), "ordem": int(ordem)})
-        row = conn.execute(text("SELECT id FROM procedimento_tipos WHERE nome=:n"), {"n": nome}).fetchone()
-        return int(row[0]) if row else 0
+            """,
+            {"nome": nome, "ativo": int(ativo), "ordem": int(ordem)},
+            "SELECT id FROM procedimento_tipos WHERE nome=:n",
+            {"n": nome},
+        )
 
 
 def set_procedimento_tipo_status(tid: int, ativo: int) -> None:
@@ -573,14 +732,53 @@ def set_procedimento_tipo_status(tid: int, ativo: int) -> None:
         conn.execute(text("UPDATE procedimento_tipos SET ativo=:a WHERE id=:i"), {"a": int(ativo), "i": int(tid)})
 
 
-def list_cirurgia_situacoes(only_active: bool = True) -> List[Tuple]:
+def upsert_procedimento_tipos_bulk(nomes: Iterable[str], ativo: int = 1, start_ordem: int = 1) -> int:
+    """
+    Cadastra/atualiza vários tipos por nome em um único executemany.
+    A ordem é atribuída sequencialmente a partir de 'start_ordem'. Retorna a quantidade enviada.
+    """
+    params = [
+        {"nome": nome, "ativo": int(ativo), "ordem": int(start_ordem) + i}
+        for i, nome in enumerate(n for n in map(_safe_str, nomes) if n)
+    ]
+    if not params:
+        return 0
+    ensure_unique_indexes()
+    ensure_db_writable()
+    eng = get_engine()
+    with eng.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO procedimento_tipos (nome, ativo, ordem)
+            VALUES (:nome, :ativo, :ordem)
+            ON CONFLICT(nome) DO UPDATE SET ativo=excluded.ativo, ordem=excluded.ordem
+        """), params)
+    return len(params)
+
+
+def bulk_update_procedimento_tipos(rows: Iterable[Tuple[int, int, int]]) -> int:
+    """
+    Atualiza (ativo, ordem) de vários tipos em um único executemany.
+    'rows' = [(id, ativo, ordem), ...]. Retorna a quantidade de linhas enviadas.
+    """
+    params = [{"i": int(i), "a": int(a), "o": int(o)} for i, a, o in rows]
+    if not params:
+        return 0
+    ensure_db_writable()
+    eng = get_engine()
+    with eng.begin() as conn:
+        conn.execute(text("UPDATE procedimento_tipos SET ativo=:a, ordem=:o WHERE id=:i"), params)
+    return len(params)
+
+
+def list_cirurgia_situacoes(only_active: bool = True) -> pd.DataFrame:
+    """Catálogo como DataFrame (id, nome, ativo, ordem), lido direto do cursor via read_sql_query."""
     eng = get_engine()
     sql = "SELECT id, nome, ativo, ordem FROM cirurgia_situacoes"
     if only_active:
         sql += " WHERE ativo=1"
     sql += " ORDER BY ordem, nome"
     with eng.connect() as conn:
-        return conn.execute(text(sql)).fetchall()
+        return pd.read_sql_query(text(sql), conn)
 
 
 def upsert_cirurgia_situacao(nome: str, ativo: int = 1, ordem: int = 1) -> int:
@@ -589,13 +787,17 @@ def upsert_cirurgia_situacao(nome: str, ativo: int = 1, ordem: int = 1) -> int:
     eng = get_engine()
     nome = _safe_str(nome)
     with eng.begin() as conn:
-        conn.execute(text("""
+        return _upsert_returning_id(
+            conn,
+            """
             INSERT INTO cirurgia_situacoes (nome, ativo, ordem)
             VALUES (:nome, :ativo, :ordem)
             ON CONFLICT(nome) DO UPDATE SET ativo=excluded.ativo, ordem=excluded.ordem
-        """), {"nome": nome, "ativo": int(ativo), "ordem": int(ordem)})
-        row = conn.execute(text("SELECT id FROM cirurgia_situacoes WHERE nome=:n"), {"n": nome}).fetchone()
-        return int(row[0]) if row else 0
+            """,
+            {"nome": nome, "ativo": int(ativo), "ordem": int(ordem)},
+            "SELECT id FROM cirurgia_situacoes WHERE nome=:n",
+            {"n": nome},
+        )
 
 
 def set_cirurgia_situacao_status(sid: int, ativo: int) -> None:
@@ -605,6 +807,21 @@ def set_cirurgia_situacao_status(sid: int, ativo: int) -> None:
         conn.execute(text("UPDATE cirurgia_situacoes SET ativo=:a WHERE id=:i"), {"a": int(ativo), "i": int(sid)})
 
 
+def bulk_update_cirurgia_situacoes(rows: Iterable[Tuple[int, int, int]]) -> int:
+    """
+    Atualiza (ativo, ordem) de várias situações em um único executemany.
+    'rows' = [(id, ativo, ordem), ...]. Retorna a quantidade de linhas enviadas.
+    """
+    params = [{"i": int(i), "a": int(a), "o": int(o)} for i, a, o in rows]
+    if not params:
+        return 0
+    ensure_db_writable()
+    eng = get_engine()
+    with eng.begin() as conn:
+        conn.execute(text("UPDATE cirurgia_situacoes SET ativo=:a, ordem=:o WHERE id=:i"), params)
+    return len(params)
+
+
 # =============================================================================
 # CIRURGIAS (UPSERT / LISTA / DELETE)
 # =============================================================================
@@ -629,7 +846,9 @@ def insert_or_update_cirurgia(payload: Dict[str, Any]) -> int:
     now = datetime.now().isoformat(timespec="seconds")
     eng = get_engine()
     with eng.begin() as conn:
-        conn.execute(text("""
+        return _upsert_returning_id(
+            conn,
+            """
             INSERT INTO cirurgias (
                 Hospital, Atendimento, Paciente, Prestador, Data_Cirurgia,
                 Convenio, Procedimento_Tipo_ID, Situacao_ID,
@@ -651,22 +870,24 @@ def insert_or_update_cirurgia(payload: Dict[str, Any]) -> int:
                 Fatura=excluded.Fatura,
                 Observacoes=excluded.Observacoes,
                 updated_at=excluded.updated_at
-        """), {
-            "Hospital": h, "Atendimento": att, "Paciente": pac, "Prestador": p, "Data": d,
-            "Convenio": _safe_str(payload.get("Convenio")),
-            "TipoID": payload.get("Procedimento_Tipo_ID"),
-            "SitID": payload.get("Situacao_ID"),
-            "Guia": _safe_str(payload.get("Guia_AMHPTISS")),
-            "GuiaC": _safe_str(payload.get("Guia_AMHPTISS_Complemento")),
-            "Fatura": _safe_str(payload.get("Fatura")),
-            "Obs": _safe_str(payload.get("Observacoes")),
-            "created": now, "updated": now
-        })
-        row = conn.execute(text("""
+            """,
+            {
+                "Hospital": h, "Atendimento": att, "Paciente": pac, "Prestador": p, "Data": d,
+                "Convenio": _safe_str(payload.get("Convenio")),
+                "TipoID": payload.get("Procedimento_Tipo_ID"),
+                "SitID": payload.get("Situacao_ID"),
+                "Guia": _safe_str(payload.get("Guia_AMHPTISS")),
+                "GuiaC": _safe_str(payload.get("Guia_AMHPTISS_Complemento")),
+                "Fatura": _safe_str(payload.get("Fatura")),
+                "Obs": _safe_str(payload.get("Observacoes")),
+                "created": now, "updated": now
+            },
+            """
             SELECT id FROM cirurgias
             WHERE Hospital=:h AND Atendimento=:a AND Paciente=:p AND Prestador=:pr AND Data_Cirurgia=:d
-        """), {"h": h, "a": att, "p": pac, "pr": p, "d": d}).fetchone()
-        return int(row[0]) if row else 0
+            """,
+            {"h": h, "a": att, "p": pac, "pr": p, "d": d},
+        )
 
 
 def _ano_mes_clause_for_cirurgias(ano_mes: Optional[str]) -> Tuple[str, dict]:
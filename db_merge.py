@@ -13,6 +13,7 @@ Tabelas e regras:
 1) pacientes_unicos_por_dia_prestador
    UNIQUE(Hospital, Atendimento, Paciente, Prestador, Data)
    • Atualiza: Aviso, Convenio, Quarto.
+   • Data_INT (YYYYMMDD) é recalculado para as linhas novas quando a coluna existe.
 
 2) procedimento_tipos
    UNIQUE(nome)
@@ -39,6 +40,8 @@ from __future__ import annotations
 import shutil
 from sqlalchemy import create_engine, text
 
+from db_sql import DATA_INT_SQL
+
 
 def merge_sqlite_dbs(local_path: str, remote_path: str, output_path: str) -> None:
     """
@@ -72,6 +75,14 @@ def merge_sqlite_dbs(local_path: str, remote_path: str, output_path: str) -> Non
                 Convenio = excluded.Convenio,
                 Quarto   = excluded.Quarto;
         """))
+        # Data_INT (YYYYMMDD) das linhas vindas do LOCAL, quando o banco de saída já tem a coluna
+        cols_base = {r[1] for r in conn.execute(text("PRAGMA table_info(pacientes_unicos_por_dia_prestador)"))}
+        if "Data_INT" in cols_base:
+            conn.execute(text(f"""
+                UPDATE pacientes_unicos_por_dia_prestador
+                SET Data_INT = {DATA_INT_SQL}
+                WHERE Data_INT IS NULL;
+            """))
 
         # ----------------------------------------------------
         # 2) Catálogo de Tipos de Procedimento
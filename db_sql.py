@@ -0,0 +1,18 @@
+# db_sql.py
+# -*- coding: utf-8 -*-
+"""
+Trechos de SQL compartilhados entre db.py e db_merge.py.
+
+Sem dependências (nem streamlit, nem sqlalchemy): importar este módulo não cria engine,
+diretórios nem conexões.
+"""
+
+# Data canônica YYYYMMDD (coluna Data_INT): Ano/Mes/Dia quando válidos, senão a Data em texto
+# (dd/mm/aaaa ou aaaa-mm-dd). Mesma regra de db._data_int_series.
+DATA_INT_SQL = """
+    CASE
+        WHEN Ano > 0 AND Mes > 0 AND Dia > 0 THEN Ano * 10000 + Mes * 100 + Dia
+        WHEN Data LIKE '__/__/____%' THEN CAST(substr(Data, 7, 4) || substr(Data, 4, 2) || substr(Data, 1, 2) AS INTEGER)
+        WHEN Data LIKE '____-__-__%' THEN CAST(substr(Data, 1, 4) || substr(Data, 6, 2) || substr(Data, 9, 2) AS INTEGER)
+    END
+"""
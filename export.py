@@ -1,9 +1,17 @@
 
 # export.py
+import datetime as _dt
 import io
+import math
+import numbers
 import re
+import numpy as np
 import pandas as pd
 
+# xlsxwriter em modo streaming: cada linha vai para disco assim que é escrita (memória ~O(1 linha))
+# (strings_to_urls=False: textos nunca viram hyperlink, o que também poupa a checagem de URL)
+_XLSX_STREAM_KWARGS = {"options": {"constant_memory": True, "strings_to_urls": False}}
+
 # ---------------- Helpers de formatação ----------------
 
 _INVALID_SHEET_CHARS_RE = re.compile(r'[:\\/?*\[\]]')
@@ -28,23 +36,39 @@ def _sanitize_sheet_name(name: str, fallback: str = "Dados") -> str:
     return name[:31]
 
 
+def _unique_sheet_name(name: str, used: set) -> str:
+    """
+    Excel não aceita abas repetidas (sem diferenciar maiúsculas): hospitais que saneiam/truncam
+    para o mesmo nome ganham _2, _3... sem passar dos 31 caracteres.
+    """
+    if name.lower() not in used:
+        return name
+    n = 2
+    while True:
+        suffix = f"_{n}"
+        candidate = name[:31 - len(suffix)] + suffix
+        if candidate.lower() not in used:
+            return candidate
+        n += 1
+
+
 def _write_sheet(writer: pd.ExcelWriter, sheet_name: str, df: pd.DataFrame):
     """
-    Escreve o DataFrame com cabeçalho formatado, autofiltro e ajuste de larguras.
+    Escreve o DataFrame célula a célula no worksheet (compatível com constant_memory),
+    com cabeçalho formatado, autofiltro e larguras calculadas na mesma passada.
+    Números (inclusive NumPy), booleanos e datas mantêm o tipo da célula, como no to_excel.
     """
     if df is None or df.empty:
         return
 
-    df = df.copy()
-
-    # Converte colunas com objetos complexos em string para evitar erros de escrita
-    for c in df.columns:
-        if df[c].dtype == "object":
-            df[c] = df[c].apply(lambda x: "" if x is None else str(x))
+    # Converte colunas com objetos complexos em string para evitar erros de escrita (vetorizado)
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df = df.copy()
+        df[obj_cols] = df[obj_cols].fillna("").astype(str)
 
-    df.to_excel(writer, sheet_name=sheet_name, index=False)
     wb = writer.book
-    ws = writer.sheets[sheet_name]
+    ws = wb.add_worksheet(_unique_sheet_name(sheet_name, {w.get_name().lower() for w in wb.worksheets()}))
 
     # Cabeçalho
     header_fmt = wb.add_format({
@@ -53,56 +77,77 @@ def _write_sheet(writer: pd.ExcelWriter, sheet_name: str, df: pd.DataFrame):
         "border": 1
     })
 
+    # Mesmos formatos de data que o to_excel do pandas usa por padrão
+    datetime_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd"})
+
+    maxlen = []
     for col_num, value in enumerate(df.columns.values):
-        ws.write(0, col_num, value, header_fmt)
+        ws.write_string(0, col_num, str(value), header_fmt)
+        maxlen.append(len(str(value)))
 
-    # Autofiltro (range correto)
+    # Autofiltro (range correto) — definido antes das linhas
     last_row = max(len(df), 1)
     ws.autofilter(0, 0, last_row, max(0, len(df.columns) - 1))
 
+    # Linhas em ordem (exigência do constant_memory); largura acumulada durante a escrita
+    for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        for i, v in enumerate(row):
+            if v is None or v is pd.NA or v is pd.NaT:
+                continue
+            if isinstance(v, (bool, np.bool_)):
+                ws.write_boolean(r, i, bool(v))
+                n = 5
+            elif isinstance(v, numbers.Real):  # int/float nativos e np.integer/np.floating
+                f = float(v)
+                if f != f:
+                    continue
+                if math.isinf(f):
+                    v = str(v)
+                    ws.write_string(r, i, v)
+                else:
+                    ws.write_number(r, i, f)
+                n = len(str(v))
+            elif isinstance(v, _dt.datetime):  # inclui pd.Timestamp
+                ws.write_datetime(r, i, v.replace(tzinfo=None) if v.tzinfo else v, datetime_fmt)
+                n = 19
+            elif isinstance(v, _dt.date):
+                ws.write_datetime(r, i, v, date_fmt)
+                n = 10
+            else:
+                v = str(v)
+                ws.write_string(r, i, v)
+                n = len(v)
+            if n > maxlen[i]:
+                maxlen[i] = n
+
     # Ajuste automático de largura com limites razoáveis
-    for i, col in enumerate(df.columns):
-        valores = [str(x) for x in df[col].tolist()]
-        maxlen = max([len(str(col))] + [len(v) for v in valores if v]) + 2
-        ws.set_column(i, i, max(14, min(maxlen, 60)))
+    for i, m in enumerate(maxlen):
+        ws.set_column(i, i, max(14, min(m + 2, 60)))
 
 
-# ---------------- Exportações (Pacientes) ----------------
-
-def to_formatted_excel_cirurgias(df: pd.DataFrame) -> io.BytesIO:
+def to_formatted_excel(df: pd.DataFrame, sheet_name: str = "Dados") -> io.BytesIO:
     """
-    Gera um Excel organizado por Hospital, garantindo que as colunas
-    estjam na ordem correta e visualmente limpas.
+    Gera um Excel de uma única aba (cabeçalho formatado, autofiltro e larguras), em streaming.
     """
     output = io.BytesIO()
-    
+    sheet_name = _sanitize_sheet_name(sheet_name)
+
     if df is None or df.empty:
         with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            pd.DataFrame({"Aviso": ["Nenhum dado encontrado para os filtros selecionados"]}).to_excel(writer, index=False)
+            pd.DataFrame(columns=getattr(df, "columns", [])).to_excel(writer, sheet_name=sheet_name, index=False)
         output.seek(0)
         return output
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        # Se houver a coluna Hospital, criamos abas separadas
-        hospital_col = "Hospital" if "Hospital" in df.columns else None
-        
-        if hospital_col:
-            hospitais = df[hospital_col].unique()
-            for hosp in sorted(hospitais):
-                df_hosp = df[df[hospital_col] == hosp].copy()
-                # Removemos colunas técnicas do Excel final
-                cols_to_drop = ["id", "Procedimento_Tipo_ID", "Situacao_ID", "has_id", "_row_idx"]
-                df_hosp = df_hosp.drop(columns=[c for c in cols_to_drop if c in df_hosp.columns], errors="ignore")
-                
-                sheet_name = _sanitize_sheet_name(str(hosp))
-                _write_sheet(writer, sheet_name, df_hosp)
-        else:
-            _write_sheet(writer, "Cirurgias", df)
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs=_XLSX_STREAM_KWARGS) as writer:
+        _write_sheet(writer, sheet_name, df)
 
     output.seek(0)
     return output
 
 
+# ---------------- Exportações (Pacientes) ----------------
+
 def to_formatted_excel_by_hospital(df: pd.DataFrame) -> io.BytesIO:
     """
     Gera um Excel com uma aba por Hospital. Proteção contra None incluída.
@@ -119,26 +164,28 @@ def to_formatted_excel_by_hospital(df: pd.DataFrame) -> io.BytesIO:
             output.seek(0)
             return output
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs=_XLSX_STREAM_KWARGS) as writer:
         if "Hospital" not in df.columns:
             _write_sheet(writer, "Dados", df)
         else:
-            df_aux = df.copy()
-            df_aux["Hospital"] = (
-                df_aux["Hospital"]
+            # assign troca só a coluna Hospital (sem df.copy() + atribuição em cima da cópia)
+            df_aux = df.assign(Hospital=(
+                df["Hospital"]
                 .fillna("Sem_Hospital")
                 .astype(str)
                 .str.strip()
                 .replace("", "Sem_Hospital")
-            )
+            ))
 
             order_cols = [c for c in ["Ano", "Mes", "Dia", "Paciente", "Prestador"] if c in df_aux.columns]
 
-            # Ordena hospitais para gerar abas previsíveis
-            for hosp in sorted(df_aux["Hospital"].unique()):
-                dfh = df_aux[df_aux["Hospital"] == hosp].copy()
+            # Particiona por hospital numa única passada (posições inteiras por grupo) e fatia com iloc;
+            # abas em ordem alfabética (previsíveis)
+            groups = df_aux.groupby("Hospital", sort=True).indices
+            for hosp in sorted(groups):
+                dfh = df_aux.iloc[groups[hosp]]
                 if order_cols:
-                    dfh = dfh.sort_values(order_cols, kind="mergesort")
+                    dfh = dfh.sort_values(order_cols, kind="stable")
 
                 sheet_name = _sanitize_sheet_name(hosp, fallback="Sem_Hospital")
                 _write_sheet(writer, sheet_name, dfh)
@@ -149,9 +196,79 @@ def to_formatted_excel_by_hospital(df: pd.DataFrame) -> io.BytesIO:
 
 # ---------------- Exportações (Cirurgias) ----------------
 
+# Acima desse total de células o export de cirurgias usa openpyxl em modo write_only
+_OPENPYXL_MIN_CELLS = 1_000_000
+
+
+def _cirurgias_sheets(df: pd.DataFrame):
+    """
+    Gera (nome_da_aba, DataFrame) por hospital: uma única ordenação (Hospital + colunas, estável)
+    e um único particionamento (groupby(...).indices + iloc); abas na ordem alfabética já obtida.
+    """
+    if "Hospital" not in df.columns:
+        yield "Cirurgias", df
+        return
+
+    df_aux = df.assign(Hospital=(
+        df["Hospital"]
+        .fillna("Sem_Hospital")
+        .astype(str)
+        .str.strip()
+        .replace("", "Sem_Hospital")
+    ))
+    order_cols = [c for c in ["Data_Cirurgia", "Paciente"] if c in df_aux.columns]
+    df_aux = df_aux.sort_values(["Hospital"] + order_cols, kind="stable")
+
+    groups = df_aux.groupby("Hospital", sort=True).indices
+    for hosp in sorted(groups):
+        yield _sanitize_sheet_name(hosp, fallback="Sem_Hospital"), df_aux.iloc[groups[hosp]]
+
+
+def _cirurgias_openpyxl(df: pd.DataFrame, output: io.BytesIO) -> None:
+    """
+    Caminho para exports muito grandes: openpyxl write_only (linhas anexadas em streaming,
+    sem passar pelo writer do pandas). Mantém cabeçalho destacado e autofiltro.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    thin = Side(style="thin")
+    for sheet_name, dfh in _cirurgias_sheets(df):
+        if dfh.empty:
+            continue
+        ws = wb.create_sheet(sheet_name)
+        ws.auto_filter.ref = f"A1:{get_column_letter(max(1, len(dfh.columns)))}{len(dfh) + 1}"
+
+        header = []
+        for c in dfh.columns:
+            cell = WriteOnlyCell(ws, value=str(c))
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill("solid", fgColor="DCE6F1")
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            header.append(cell)
+        ws.append(header)
+
+        # Objetos/NaN como no _write_sheet: texto e célula vazia
+        obj_cols = dfh.select_dtypes(include="object").columns
+        if len(obj_cols):
+            dfh = dfh.copy()
+            dfh[obj_cols] = dfh[obj_cols].fillna("").astype(str)
+        for row in dfh.itertuples(index=False, name=None):
+            ws.append([None if (v is None or v is pd.NA or v is pd.NaT or (isinstance(v, float) and v != v))
+                       else v for v in row])
+
+    if not wb.worksheets:
+        wb.create_sheet("Cirurgias")
+    wb.save(output)
+
+
 def to_formatted_excel_cirurgias(df: pd.DataFrame) -> io.BytesIO:
     """
     Exporta cirurgias em Excel com proteção contra dados nulos.
+    Até _OPENPYXL_MIN_CELLS células usa xlsxwriter (constant_memory); acima disso, openpyxl write_only.
     """
     output = io.BytesIO()
 
@@ -165,30 +282,14 @@ def to_formatted_excel_cirurgias(df: pd.DataFrame) -> io.BytesIO:
             output.seek(0)
             return output
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        if "Hospital" not in df.columns:
-            _write_sheet(writer, "Cirurgias", df)
-        else:
-            df_aux = df.copy()
-            df_aux["Hospital"] = (
-                df_aux["Hospital"]
-                .fillna("Sem_Hospital")
-                .astype(str)
-                .str.strip()
-                .replace("", "Sem_Hospital")
-            )
-
-            # Ordena hospitais para gerar abas consistentes
-            for hosp in sorted(df_aux["Hospital"].unique()):
-                dfh = df_aux[df_aux["Hospital"] == hosp].copy()
-
-                # Ordena colunas se existirem
-                order_cols = [c for c in ["Data_Cirurgia", "Paciente"] if c in dfh.columns]
-                if order_cols:
-                    dfh = dfh.sort_values(order_cols, kind="mergesort")
+    if df.shape[0] * df.shape[1] > _OPENPYXL_MIN_CELLS:
+        _cirurgias_openpyxl(df, output)
+        output.seek(0)
+        return output
 
-                sheet_name = _sanitize_sheet_name(hosp, fallback="Sem_Hospital")
-                _write_sheet(writer, sheet_name, dfh)
+    with pd.ExcelWriter(output, engine="xlsxwriter", engine_kwargs=_XLSX_STREAM_KWARGS) as writer:
+        for sheet_name, dfh in _cirurgias_sheets(df):
+            _write_sheet(writer, sheet_name, dfh)
 
     output.seek(0)
     return output
@@ -13,22 +13,36 @@ Funcionalidades:
 PATCHES:
 - ✅ Checkpoint do WAL antes de ler/enviar o arquivo (garante que o .db reflita o estado atual).
 - ✅ Função get_remote_sha(...) para atualizar o SHA remoto no app após upload bem-sucedido.
+- ✅ Upload de arquivos > 1 MB via Git Data API (blob + tree + commit + ref).
+- ✅ Arquivos > 25 MB como asset binário da release 'db-store' (download dá precedência ao asset).
 """
 
 import base64
+import functools
+import hashlib
 import json
 import os
+import re
 import shutil
 import tempfile
+import time
 import sqlite3  # ✅ novo
 from typing import Optional, Tuple, Union
 
 # Importa a função de merge do módulo externo
 from db_merge import merge_sqlite_dbs
 
+# Descarte de conexões do SQLAlchemy antes do checkpoint (depende do seu próprio módulo db.py)
+try:
+    from db import dispose_engine
+except Exception:
+    dispose_engine = None
+
 # HTTP: usa 'requests' se disponível; senão, 'urllib'
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     _HAS_REQUESTS = True
 except Exception:
     _HAS_REQUESTS = False
@@ -59,40 +73,76 @@ def _resolve_token(token: Optional[str]) -> Optional[str]:
     return os.environ.get("GITHUB_TOKEN")
 
 
+# Prefixos "/", "\", "./" e ".\" (repetidos) no caminho do arquivo dentro do repositório
+_PREFIX_RE = re.compile(r"^(?:[/\\]|\.[/\\])+")
+
+
+def _normalize_repo_path(p: str) -> str:
+    """Caminho relativo à raiz do repo (a Contents API não aceita '/' ou './' no início)."""
+    p = _PREFIX_RE.sub("", str(p or "").strip())
+    if not p:
+        raise ValueError("path_in_repo vazio")
+    return p
+
+
+# Cabeçalhos fixos (ficam na Session; no fallback urllib são mesclados a cada chamada)
+_BASE_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "User-Agent": "github-sync-sqlite/1.2",
+}
+
+
 def _gh_headers(token: Optional[str]) -> dict:
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "User-Agent": "github-sync-sqlite/1.2",
-    }
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    return headers
+    """Somente o cabeçalho de autenticação; o restante vem de _BASE_HEADERS."""
+    return {"Authorization": f"Bearer {token}"} if token else {}
 
 
-def _http_get(url: str, headers: dict) -> Tuple[int, bytes]:
+@functools.lru_cache(maxsize=1)
+def _session() -> "requests.Session":
+    """
+    Session HTTP reutilizada entre chamadas/reruns (keep-alive: evita novo handshake TLS por request).
+    Retry com backoff só para GET em 502/503/504 (PUT não é repetido automaticamente).
+    """
+    s = requests.Session()
+    s.headers.update(_BASE_HEADERS)
+    s.headers["Accept-Encoding"] = "gzip"  # requests descomprime; urllib não, por isso fica só aqui
+    # raise_on_status=False: esgotadas as tentativas, devolve a resposta (status) em vez de RetryError
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                  allowed_methods=frozenset({"GET"}), raise_on_status=False)
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry))
+    return s
+
+
+def _http_get_ex(url: str, headers: dict) -> Tuple[int, bytes, dict]:
+    """GET retornando também os cabeçalhos da resposta (chaves em minúsculas: 'etag' etc.)."""
     if _HAS_REQUESTS:
-        resp = requests.get(url, headers=headers)
-        return resp.status_code, resp.content
+        resp = _session().get(url, headers=headers)
+        return resp.status_code, resp.content, {k.lower(): v for k, v in resp.headers.items()}
     # urllib fallback
-    req = urllib.request.Request(url, headers=headers, method="GET")
+    req = urllib.request.Request(url, headers={**_BASE_HEADERS, **headers}, method="GET")
     try:
         with urllib.request.urlopen(req) as resp:
-            return resp.getcode(), resp.read()
+            return resp.getcode(), resp.read(), {k.lower(): v for k, v in resp.headers.items()}
     except urllib.error.HTTPError as e:
-        return e.code, e.read()
+        return e.code, e.read(), {k.lower(): v for k, v in (e.headers or {}).items()}
     except urllib.error.URLError:
-        return 0, b""
+        return 0, b"", {}
 
 
-def _http_put_json(url: str, headers: dict, payload: dict) -> Tuple[int, bytes]:
+def _http_get(url: str, headers: dict) -> Tuple[int, bytes]:
+    status, content, _ = _http_get_ex(url, headers)
+    return status, content
+
+
+def _http_send_json(method: str, url: str, headers: dict, payload: dict) -> Tuple[int, bytes]:
     body = json.dumps(payload).encode("utf-8")
     hdrs = dict(headers)
     hdrs["Content-Type"] = "application/json"
     if _HAS_REQUESTS:
-        resp = requests.put(url, headers=hdrs, data=json.dumps(payload))
+        resp = _session().request(method, url, headers=hdrs, data=body)
         return resp.status_code, resp.content
     # urllib fallback
-    req = urllib.request.Request(url, headers=hdrs, data=body, method="PUT")
+    req = urllib.request.Request(url, headers={**_BASE_HEADERS, **hdrs}, data=body, method=method)
     try:
         with urllib.request.urlopen(req) as resp:
             return resp.getcode(), resp.read()
@@ -102,6 +152,40 @@ def _http_put_json(url: str, headers: dict, payload: dict) -> Tuple[int, bytes]:
         return 0, b""
 
 
+def _http_put_json(url: str, headers: dict, payload: dict) -> Tuple[int, bytes]:
+    return _http_send_json("PUT", url, headers, payload)
+
+
+def _json_or_empty(content: bytes) -> dict:
+    try:
+        return json.loads(content.decode("utf-8")) or {}
+    except Exception:
+        return {}
+
+
+# =========================
+# SHA de blob Git (mesmo valor que a API devolve em 'sha')
+# =========================
+
+def _git_blob_sha1(data: bytes) -> str:
+    h = hashlib.sha1()
+    h.update(f"blob {len(data)}\0".encode("ascii"))
+    h.update(data)
+    return h.hexdigest()
+
+
+def _local_blob_sha1(path: str) -> Optional[str]:
+    """SHA do .db local; None se não existir ou se houver WAL pendente (arquivo principal defasado)."""
+    try:
+        wal = path + "-wal"
+        if os.path.exists(wal) and os.path.getsize(wal) > 0:
+            return None
+        with open(path, "rb") as f:
+            return _git_blob_sha1(f.read())
+    except OSError:
+        return None
+
+
 # =========================
 # WAL checkpoint helper (✅ novo)
 # =========================
@@ -113,11 +197,11 @@ def _checkpoint_sqlite(path: str) -> None:
     """
     try:
         # Tenta descartar conexões do SQLAlchemy para evitar "database is locked"
-        try:
-            from db import dispose_engine  # depende do seu próprio módulo db.py
-            dispose_engine()
-        except Exception:
-            pass
+        if dispose_engine is not None:
+            try:
+                dispose_engine()
+            except Exception:
+                pass
 
         with sqlite3.connect(path) as conn:
             # FULL garantiria aplicar tudo; TRUNCATE aplica e limpa o .wal
@@ -131,10 +215,206 @@ def _checkpoint_sqlite(path: str) -> None:
         pass
 
 
+# =========================
+# Arquivos muito grandes (Releases API)
+# =========================
+
+# Acima disso o .db vai como asset binário de uma release (sem base64, enviado em streaming)
+_RELEASE_MIN_BYTES = 25 * 1024 * 1024
+_RELEASE_TAG = "db-store"
+
+
+def _http_delete(url: str, headers: dict) -> int:
+    if _HAS_REQUESTS:
+        return _session().delete(url, headers=headers).status_code
+    req = urllib.request.Request(url, headers={**_BASE_HEADERS, **headers}, method="DELETE")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.getcode()
+    except urllib.error.HTTPError as e:
+        return e.code
+    except urllib.error.URLError:
+        return 0
+
+
+def _http_post_file(url: str, headers: dict, path: str) -> Tuple[int, bytes]:
+    """POST do arquivo como corpo binário; com requests o arquivo é lido em streaming."""
+    hdrs = {**headers, "Content-Type": "application/octet-stream"}
+    with open(path, "rb") as f:
+        if _HAS_REQUESTS:
+            resp = _session().post(url, headers=hdrs, data=f)
+            return resp.status_code, resp.content
+        body = f.read()
+    req = urllib.request.Request(url, headers={**_BASE_HEADERS, **hdrs}, data=body, method="POST")
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.getcode(), resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except urllib.error.URLError:
+        return 0, b""
+
+
+# {url: (etag, release)} da última leitura da release: GET condicional (304 não gasta rate limit)
+_RELEASE_ETAGS: dict = {}
+# {url: instante} do último 404: repos que nunca passaram de 25 MB não consultam a release a cada chamada
+_RELEASE_MISSING: dict = {}
+_RELEASE_MISSING_TTL = 300  # segundos
+
+
+def _get_release(owner: str, repo: str, token: Optional[str]) -> Tuple[int, dict]:
+    url = f"https://api.github.com/repos/{owner}/{repo}/releases/tags/{_RELEASE_TAG}"
+    missing_at = _RELEASE_MISSING.get(url)
+    if missing_at is not None and time.monotonic() - missing_at < _RELEASE_MISSING_TTL:
+        return 404, {}
+
+    cached = _RELEASE_ETAGS.get(url)
+    headers = _gh_headers(token)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+    status, content, resp_headers = _http_get_ex(url, headers)
+    if status == 304 and cached:
+        return 200, cached[1]
+    if status == 404:
+        _RELEASE_MISSING[url] = time.monotonic()
+        _RELEASE_ETAGS.pop(url, None)
+        return 404, {}
+    _RELEASE_MISSING.pop(url, None)
+    if status != 200:
+        return status, {}
+    release = _json_or_empty(content)
+    etag = resp_headers.get("etag")
+    if etag:
+        _RELEASE_ETAGS[url] = (etag, release)
+    return 200, release
+
+
+def _ensure_release(owner: str, repo: str, branch: str, token: Optional[str]) -> Tuple[int, dict]:
+    """Release que guarda o .db grande; criada na primeira vez."""
+    status, release = _get_release(owner, repo, token)
+    if status != 404:
+        return status, release
+    # 404 pode vir do cache negativo: a criação (ou o 422 "já existe") invalida esse cache
+    _RELEASE_MISSING.pop(f"https://api.github.com/repos/{owner}/{repo}/releases/tags/{_RELEASE_TAG}", None)
+    status, content = _http_send_json(
+        "POST", f"https://api.github.com/repos/{owner}/{repo}/releases", _gh_headers(token), {
+            "tag_name": _RELEASE_TAG,
+            "target_commitish": branch,
+            "name": "Banco SQLite (arquivo grande)",
+            "body": "Asset gerenciado automaticamente pelo github_sync.py.",
+        }
+    )
+    if status == 422:
+        # Já criada por outra instância depois do 404 em cache
+        return _get_release(owner, repo, token)
+    return (200, _json_or_empty(content)) if status == 201 else (status, {})
+
+
+def _release_asset(release: dict, path_in_repo: str) -> Optional[dict]:
+    """Asset do .db na release (o 'label' guarda o SHA de blob Git do conteúdo enviado)."""
+    name = os.path.basename(path_in_repo)
+    return next((a for a in release.get("assets") or [] if a.get("name") == name), None)
+
+
+def _upload_via_release(
+    owner: str,
+    repo: str,
+    path_in_repo: str,
+    branch: str,
+    local_db_path: str,
+    local_sha: str,
+    token: Optional[str],
+    prev_sha: Optional[str],
+) -> Tuple[bool, Optional[str], int, str]:
+    """
+    Substitui o asset do .db na release _RELEASE_TAG sem janela sem banco:
+    POST binário em streaming com nome temporário -> DELETE do anterior (só após o 201) -> PATCH
+    renomeando o novo para o nome definitivo, com o SHA no label.
+    Conflito: se o asset atual tiver label diferente de 'prev_sha', retorna 409 para acionar o merge.
+    """
+    status, release = _ensure_release(owner, repo, branch, token)
+    if status != 200 or not release.get("upload_url"):
+        return False, None, status, f"Release '{_RELEASE_TAG}' unavailable (status={status})"
+
+    name = os.path.basename(path_in_repo)
+    tmp_name = f"{name}.uploading"
+    asset = _release_asset(release, path_in_repo)
+    if asset is not None and prev_sha and asset.get("label") and asset.get("label") != prev_sha:
+        return False, None, 409, "Remote release asset changed (sha mismatch)"
+
+    # Sobra de um envio interrompido (o nome temporário precisa estar livre)
+    stale = _release_asset(release, tmp_name)
+    if stale is not None:
+        st_del = _http_delete(stale.get("url"), _gh_headers(token))
+        if st_del not in (204, 404):
+            return False, None, st_del, f"Delete stale temp asset failed (status={st_del})"
+
+    # upload_url vem como template RFC 6570: ".../assets{?name,label}"
+    upload_url = release["upload_url"].split("{", 1)[0]
+    status, content = _http_post_file(f"{upload_url}?name={tmp_name}", _gh_headers(token), local_db_path)
+    if status != 201:
+        return False, None, status, content.decode("utf-8", "ignore")
+    new_asset = _json_or_empty(content)
+    if not new_asset.get("url"):
+        return False, None, status, "Upload OK but response has no asset url"
+
+    if asset is not None:
+        st_del = _http_delete(asset.get("url"), _gh_headers(token))
+        if st_del not in (204, 404):
+            _http_delete(new_asset["url"], _gh_headers(token))
+            return False, None, st_del, f"Delete old asset failed (status={st_del})"
+
+    status, content = _http_send_json(
+        "PATCH", new_asset["url"], _gh_headers(token), {"name": name, "label": local_sha}
+    )
+    if status != 200:
+        return False, None, status, f"Rename of uploaded asset failed: {content.decode('utf-8', 'ignore')}"
+    return True, local_sha, 201, "OK (release asset)"
+
+
+def _download_release_asset(asset: dict, local_db_path: str, token: Optional[str]) -> bool:
+    """
+    Baixa o asset para um temporário no mesmo diretório e só troca o .db (os.replace) se o
+    tamanho bater com asset['size']: download interrompido não deixa o banco truncado.
+    """
+    headers = {**_gh_headers(token), "Accept": "application/octet-stream"}
+    target_dir = os.path.dirname(local_db_path) or "."
+    os.makedirs(target_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".download_", suffix=".db", dir=target_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if _HAS_REQUESTS:
+                with _session().get(asset["url"], headers=headers, stream=True) as resp:
+                    if resp.status_code != 200:
+                        return False
+                    for chunk in resp.iter_content(chunk_size=1 << 20):
+                        f.write(chunk)
+            else:
+                status, content = _http_get(asset["url"], headers)
+                if status != 200:
+                    return False
+                f.write(content)
+        expected = asset.get("size")
+        if expected is not None and os.path.getsize(tmp_path) != int(expected):
+            return False
+        os.replace(tmp_path, local_db_path)
+        return True
+    except Exception:
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            try: os.unlink(tmp_path)
+            except Exception: pass
+
+
 # =========================
 # Download do .db (Contents API)
 # =========================
 
+# {url: (etag, sha)} do último download bem-sucedido (vive no processo, entre reruns)
+_DOWNLOAD_ETAGS: dict = {}
+
+
 def download_db_from_github(
     owner: str,
     repo: str,
@@ -146,11 +426,34 @@ def download_db_from_github(
 ) -> Union[bool, Tuple[bool, Optional[str]]]:
     """
     Baixa um arquivo binário do repositório GitHub (Contents API) e salva em 'local_db_path'.
+    Se existir o asset do .db na release _RELEASE_TAG (bancos grandes), ele tem precedência.
     Se o arquivo não existir no repo/branch, retorna False (e None se return_sha=True).
     """
     token = _resolve_token(token)
+    path_in_repo = _normalize_repo_path(path_in_repo)
+
+    status_rel, release = _get_release(owner, repo, token)
+    asset = _release_asset(release, path_in_repo) if status_rel == 200 else None
+    if asset is not None:
+        sha = asset.get("label") or None
+        if sha and _local_blob_sha1(local_db_path) == sha:
+            return (True, sha) if return_sha else True
+        ok = _download_release_asset(asset, local_db_path, token)
+        return (ok, sha if ok else None) if return_sha else ok
+
     url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path_in_repo}?ref={branch}"
-    status, content = _http_get(url, _gh_headers(token))
+
+    # GET condicional: se o remoto não mudou (304) e o arquivo local ainda é o blob baixado, nada a fazer
+    cached = _DOWNLOAD_ETAGS.get(url)
+    headers = _gh_headers(token)
+    if cached and os.path.exists(local_db_path):
+        headers = {**headers, "If-None-Match": cached[0]}
+    status, content, resp_headers = _http_get_ex(url, headers)
+    if status == 304:
+        if _local_blob_sha1(local_db_path) == cached[1]:
+            return (True, cached[1]) if return_sha else True
+        # Local divergiu do último download: baixa de novo, sem condicional
+        status, content, resp_headers = _http_get_ex(url, _gh_headers(token))
     if status == 404:
         return (False, None) if return_sha else False
     if status != 200:
@@ -162,19 +465,133 @@ def download_db_from_github(
         return (False, None) if return_sha else False
 
     # 'content' vem base64; 'sha' contém a versão atual do blob
+    sha = data.get("sha")
     content_b64 = data.get("content")
-    if not content_b64:
+    if content_b64 and data.get("encoding") != "none":
+        blob = base64.b64decode(content_b64)
+    elif sha:
+        # Acima de 1 MB a Contents API devolve encoding "none" e content vazio: baixa o blob cru
+        status_blob, blob = _http_get(
+            f"https://api.github.com/repos/{owner}/{repo}/git/blobs/{sha}",
+            {**_gh_headers(token), "Accept": "application/vnd.github.raw"},
+        )
+        if status_blob != 200:
+            return (False, None) if return_sha else False
+    else:
         return (False, None) if return_sha else False
 
-    blob = base64.b64decode(content_b64)
     os.makedirs(os.path.dirname(local_db_path), exist_ok=True)
     with open(local_db_path, "wb") as f:
         f.write(blob)
 
-    sha = data.get("sha")
+    etag = resp_headers.get("etag")
+    if etag and sha:
+        _DOWNLOAD_ETAGS[url] = (etag, sha)
     return (True, sha) if return_sha else True
 
 
+# =========================
+# Upload de arquivos grandes (Git Data API)
+# =========================
+
+# Acima disso o upload vai por blob + tree + commit + ref (Contents API fica para arquivos pequenos)
+_CONTENTS_API_MAX_BYTES = 1_000_000
+
+
+def _upload_via_git_data(
+    owner: str,
+    repo: str,
+    path_in_repo: str,
+    branch: str,
+    raw: bytes,
+    commit_message: str,
+    token: Optional[str],
+    prev_sha: Optional[str],
+) -> Tuple[bool, Optional[str], int, str]:
+    """
+    Sobe 'raw' como blob e cria um commit apontando para ele (POST blobs/trees/commits + PATCH ref).
+    Mantém a semântica de conflito da Contents API: se 'prev_sha' não bater com o blob remoto
+    atual (ou o ref avançar no meio do caminho), retorna status 409 para acionar o merge.
+    Retorna (ok, blob_sha, status, message).
+    """
+    api = f"https://api.github.com/repos/{owner}/{repo}"
+    headers = _gh_headers(token)
+
+    # Conflito: o blob remoto mudou desde o último sha conhecido
+    if prev_sha:
+        status_get, content_get = _http_get(f"{api}/contents/{path_in_repo}?ref={branch}", headers)
+        if status_get == 200 and _json_or_empty(content_get).get("sha") != prev_sha:
+            return False, None, 409, "Remote blob changed (sha mismatch)"
+        if status_get not in (200, 404):
+            return False, None, status_get, f"Preflight GET failed (status={status_get})"
+
+    # 1) Blob (o base64 vai direto no corpo, sem montar payload de Contents)
+    status, content = _http_send_json("POST", f"{api}/git/blobs", headers, {
+        "content": base64.b64encode(raw).decode("ascii"),
+        "encoding": "base64",
+    })
+    if status != 201:
+        return False, None, status, f"Create blob failed: {content[:500].decode('utf-8', 'ignore')}"
+    blob_sha = _json_or_empty(content).get("sha")
+
+    # 2) Commit atual do branch e sua tree
+    status, content = _http_get(f"{api}/git/ref/heads/{branch}", headers)
+    if status != 200:
+        return False, None, status, f"Get ref failed (status={status})"
+    parent_sha = (_json_or_empty(content).get("object") or {}).get("sha")
+
+    status, content = _http_get(f"{api}/git/commits/{parent_sha}", headers)
+    if status != 200:
+        return False, None, status, f"Get commit failed (status={status})"
+    base_tree = (_json_or_empty(content).get("tree") or {}).get("sha")
+
+    # 3) Nova tree com uma única entrada alterada
+    status, content = _http_send_json("POST", f"{api}/git/trees", headers, {
+        "base_tree": base_tree,
+        "tree": [{"path": path_in_repo, "mode": "100644", "type": "blob", "sha": blob_sha}],
+    })
+    if status != 201:
+        return False, None, status, f"Create tree failed: {content[:500].decode('utf-8', 'ignore')}"
+    tree_sha = _json_or_empty(content).get("sha")
+
+    # 4) Commit
+    status, content = _http_send_json("POST", f"{api}/git/commits", headers, {
+        "message": commit_message,
+        "tree": tree_sha,
+        "parents": [parent_sha],
+    })
+    if status != 201:
+        return False, None, status, f"Create commit failed: {content[:500].decode('utf-8', 'ignore')}"
+    commit_sha = _json_or_empty(content).get("sha")
+
+    # 5) Avança o ref (sem force: se alguém commitou antes, vira conflito)
+    status, content = _http_send_json("PATCH", f"{api}/git/refs/heads/{branch}", headers, {
+        "sha": commit_sha,
+        "force": False,
+    })
+    if status == 200:
+        return True, blob_sha, 200, "OK"
+    if status == 422:
+        return False, None, 409, "Branch moved during upload (non fast-forward)"
+    return False, None, status, content.decode("utf-8", "ignore")
+
+
+def _drop_stale_release_asset(owner: str, repo: str, path_in_repo: str, token: Optional[str], uploaded: bool) -> None:
+    """
+    Após subir pelo repositório (banco voltou a caber), remove o asset de release antigo,
+    que senão teria precedência no download. Best-effort.
+    """
+    if not uploaded:
+        return
+    try:
+        status, release = _get_release(owner, repo, token)
+        asset = _release_asset(release, path_in_repo) if status == 200 else None
+        if asset is not None:
+            _http_delete(asset.get("url"), _gh_headers(token))
+    except Exception:
+        pass
+
+
 # =========================
 # Upload do .db (Contents API) com preflight GET
 # =========================
@@ -188,19 +605,25 @@ def upload_db_to_github(
     commit_message: str,
     token: Optional[str] = None,
     prev_sha: Optional[str] = None,
+    checkpoint: bool = True,
     _return_details: bool = False
 ) -> Union[bool, Tuple[bool, Optional[str], int, str]]:
     """
     Faz upload (PUT) do arquivo local para o GitHub (Contents API).
+    Arquivos acima de _CONTENTS_API_MAX_BYTES seguem pela Git Data API (_upload_via_git_data)
+    e acima de _RELEASE_MIN_BYTES viram asset de release (_upload_via_release).
     - Se 'prev_sha' for informado, tenta update diretamente com esse sha.
     - Se 'prev_sha' for None, primeiro faz GET para descobrir se o arquivo existe:
         * 200: arquivo existe -> usa sha do remoto no payload (update)
         * 404: arquivo não existe -> cria (sem sha)
+    - checkpoint=False pula o checkpoint do WAL (e o dispose do engine): use para enviar um
+      snapshot já consistente a partir de outra thread.
     - Retorna:
         * _return_details=False: bool
         * _return_details=True: (ok, new_sha, status_code, message)
     """
     token = _resolve_token(token)
+    path_in_repo = _normalize_repo_path(path_in_repo)
     url_put = f"https://api.github.com/repos/{owner}/{repo}/contents/{path_in_repo}"
 
     if not os.path.exists(local_db_path):
@@ -208,7 +631,8 @@ def upload_db_to_github(
         return (False, None, 0, msg) if _return_details else False
 
     # ✅ Força checkpoint do WAL antes de ler o arquivo
-    _checkpoint_sqlite(local_db_path)
+    if checkpoint:
+        _checkpoint_sqlite(local_db_path)
 
     # Lê arquivo local
     with open(local_db_path, "rb") as f:
@@ -217,7 +641,26 @@ def upload_db_to_github(
         msg = "Local db file is empty (0 bytes)"
         return (False, None, 422, msg) if _return_details else False
 
-    b64 = base64.b64encode(raw).decode("utf-8")
+    # Conteúdo idêntico ao blob remoto conhecido: nada a enviar
+    local_sha = _git_blob_sha1(raw)
+    if prev_sha and prev_sha == local_sha:
+        return (True, local_sha, 200, "Unchanged (sha match)") if _return_details else True
+
+    # Muito grandes: asset binário de release (sem base64, em streaming)
+    if len(raw) > _RELEASE_MIN_BYTES:
+        del raw
+        result = _upload_via_release(
+            owner, repo, path_in_repo, branch, local_db_path, local_sha, token, prev_sha
+        )
+        return result if _return_details else result[0]
+
+    # Arquivos grandes: Git Data API (a Contents API fica para arquivos até ~1 MB)
+    if len(raw) > _CONTENTS_API_MAX_BYTES:
+        result = _upload_via_git_data(
+            owner, repo, path_in_repo, branch, raw, commit_message, token, prev_sha
+        )
+        _drop_stale_release_asset(owner, repo, path_in_repo, token, result[0])
+        return result if _return_details else result[0]
 
     # Decide entre create/update
     sha_to_use = prev_sha
@@ -238,6 +681,10 @@ def upload_db_to_github(
             msg = f"Preflight GET failed (status={status_get})"
             return (False, None, status_get, msg) if _return_details else False
 
+        if sha_to_use == local_sha:
+            return (True, local_sha, 200, "Unchanged (sha match)") if _return_details else True
+
+    b64 = base64.b64encode(raw).decode("utf-8")
     payload = {
         "message": commit_message,
         "content": b64,
@@ -248,6 +695,7 @@ def upload_db_to_github(
     # else: create
 
     status_put, content_put = _http_put_json(url_put, _gh_headers(token), payload)
+    _drop_stale_release_asset(owner, repo, path_in_repo, token, status_put in (200, 201))
     if status_put in (200, 201):
         try:
             data_put = json.loads(content_put.decode("utf-8"))
@@ -278,8 +726,14 @@ def get_remote_sha(
     """
     Retorna o SHA atual do blob no GitHub sem baixar o arquivo.
     Útil para atualizar o st.session_state['gh_sha'] após upload bem-sucedido.
+    Para bancos guardados como asset de release, devolve o SHA gravado no label do asset.
     """
     token = _resolve_token(token)
+    path_in_repo = _normalize_repo_path(path_in_repo)
+    status_rel, release = _get_release(owner, repo, token)
+    asset = _release_asset(release, path_in_repo) if status_rel == 200 else None
+    if asset is not None and asset.get("label"):
+        return asset["label"]
     url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path_in_repo}?ref={branch}"
     status, content = _http_get(url, _gh_headers(token))
     if status != 200:
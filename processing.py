@@ -24,6 +24,15 @@ TIME_RE = re.compile(r"^\d{1,2}:\d{2}$")
 DATE_RE = re.compile(r"\b(\d{2}/\d{2}/\d{4})\b")
 HAS_LETTER_RE = re.compile(r"[A-Za-zÁÉÍÓÚÃÕÇáéíóúãõç]")
 SECTION_KEYWORDS = ["CENTRO CIRURGICO", "HEMODINAMICA", "CENTRO OBSTETRICO"]
+HEADER_PHRASES = ["Hora", "Atendimento", "Paciente", "Convênio", "Prestador"]
+
+# Uma única varredura em C por linha (alternação compilada) em vez de N buscas de substring
+HEADER_RE = re.compile("|".join(map(re.escape, HEADER_PHRASES)))
+SECTION_LINE_RE = re.compile("Centro Cir[uú]rgico")
+
+# Testes por token do parser, compilados uma vez (sem lookup no cache do re a cada chamada)
+AVISO_RE = re.compile(r"\d{3,}")
+ATENDIMENTO_RE = re.compile(r"\d{7,10}")
 
 EXPECTED_COLS = [
     "Centro", "Data", "Atendimento", "Paciente", "Aviso",
@@ -67,6 +76,20 @@ def _strip_accents(s: str) -> str:
     s = str(s)
     return "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
 
+# Marcas diacríticas combinantes (o que sobra de um acento após a decomposição NFKD)
+COMBINING_RE = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+def _norm_upper_noacc(series: pd.Series) -> pd.Series:
+    """Versão vetorizada de _strip_accents + strip + upper (nulos viram "")."""
+    return (
+        series.astype("string")
+        .str.normalize("NFKD")
+        .str.replace(COMBINING_RE, "", regex=True)
+        .str.strip()
+        .str.upper()
+        .fillna("")
+    )
+
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty: 
         return df
@@ -109,14 +132,13 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
             continue
 
         # Detecta seção
-        if "Centro Cirurgico" in line or "Centro Cirúrgico" in line:
+        if SECTION_LINE_RE.search(line):
             current_section = next((kw for kw in SECTION_KEYWORDS if kw in line), None)
             ctx = {"hora_inicio": None}
             continue
 
         # Ignora cabeçalhos óbvios
-        header_phrases = ["Hora", "Atendimento", "Paciente", "Convênio", "Prestador"]
-        if any(h in line for h in header_phrases):
+        if HEADER_RE.search(line):
             continue
 
         # Linhas com horários → linha "principal" do caso
@@ -127,12 +149,12 @@ def _parse_raw_text_to_rows(text: str) -> pd.DataFrame:
             hora_inicio, hora_fim = tokens[h0], (tokens[h1] if h1 else None)
 
             # Aviso: token imediatamente anterior ao horário, se numérico
-            aviso = tokens[h0-1] if (h0-1 >= 0 and re.fullmatch(r"\d{3,}", tokens[h0-1])) else None
+            aviso = tokens[h0-1] if (h0-1 >= 0 and AVISO_RE.fullmatch(tokens[h0-1])) else None
 
             # Atendimento e Paciente
             atendimento, paciente = None, None
             for i, t in enumerate(tokens):
-                if re.fullmatch(r"\d{7,10}", t):  # atendimento típico 7-10 dígitos
+                if ATENDIMENTO_RE.fullmatch(t):  # atendimento típico 7-10 dígitos
                     atendimento = t
                     upper_bound = (h0 - 2) if h0 else len(tokens) - 1
                     for j in range(i+1, upper_bound+1):
@@ -186,6 +208,8 @@ def _herdar_por_data_ordem_original(df: pd.DataFrame) -> pd.DataFrame:
     """
     Copia Atendimento/Paciente/Aviso ao longo de blocos dentro da mesma Data,
     garantindo que cada médico fique com um único conjunto herdado por bloco.
+    Vetorizado (mesmo resultado da varredura linha a linha): blocos por cumsum, "médico já
+    visto no bloco" por duplicated e último registro nativo da Data por groupby.ffill.
     """
     if df is None or df.empty: 
         return df
@@ -196,39 +220,55 @@ def _herdar_por_data_ordem_original(df: pd.DataFrame) -> pd.DataFrame:
     if "_row_idx" not in df.columns:
         df["_row_idx"] = range(len(df))
 
-    for _, grp in df.groupby("Data", sort=False):
-        last_att, last_pac, last_av = pd.NA, pd.NA, pd.NA
-        medicos_no_bloco = set()
-
-        for i in grp.sort_values("_row_idx").index:
-            curr_att = df.at[i, "Atendimento"]
-            curr_pac = df.at[i, "Paciente"]
-            curr_av  = df.at[i, "Aviso"]
-            curr_prest_raw = df.at[i, "Prestador"]
-            curr_prest = str(curr_prest_raw).strip().upper() if pd.notna(curr_prest_raw) else ""
-
-            tem_dados_nativos = pd.notna(curr_att) or pd.notna(curr_pac) or pd.notna(curr_av)
-
-            if tem_dados_nativos:
-                # Se mudou o bloco (novo atendimento/aviso), reseta o conjunto de médicos no bloco
-                str_curr_att = str(curr_att) if pd.notna(curr_att) else "None"
-                str_last_att = str(last_att) if pd.notna(last_att) else "None"
-                str_curr_av  = str(curr_av)  if pd.notna(curr_av)  else "None"
-                str_last_av  = str(last_av)  if pd.notna(last_av)  else "None"
-
-                if (str_curr_att != str_last_att) or (str_curr_av != str_last_av):
-                    medicos_no_bloco = set()
+    # Ordem de varredura: Data (na ordem de aparição) e, dentro dela, _row_idx (lexsort é estável)
+    grp = df.groupby("Data", sort=False).ngroup().to_numpy()
+    order = np.lexsort((df["_row_idx"].to_numpy(), grp))
+    order = order[grp[order] >= 0]  # Data nula não participa da herança
+    if len(order) == 0:
+        return df
+    g = grp[order]
+
+    att_arr  = df["Atendimento"].to_numpy(dtype=object, copy=True)
+    pac_arr  = df["Paciente"].to_numpy(dtype=object, copy=True)
+    av_arr   = df["Aviso"].to_numpy(dtype=object, copy=True)
+    att, pac, av = att_arr[order], pac_arr[order], av_arr[order]
+    att_na, av_na = pd.isna(att), pd.isna(av)
+    nativo = ~(att_na & pd.isna(pac) & av_na)
+
+    prest_raw = pd.Series(df["Prestador"].to_numpy(dtype=object)[order])
+    prest = prest_raw.astype(str).str.strip().str.upper().where(prest_raw.notna(), "").to_numpy(dtype=object)
+
+    # Novo bloco: início da Data ou linha nativa cujo (Atendimento, Aviso) difere do último nativo
+    chave = (
+        pd.Series(att).astype(str).where(~att_na, "None")
+        + "\x1f"
+        + pd.Series(av).astype(str).where(~av_na, "None")
+    )
+    anterior = chave.where(nativo).groupby(g).ffill().groupby(g).shift(1).fillna("None\x1fNone")
+    inicio = np.r_[True, g[1:] != g[:-1]]
+    bloco = np.cumsum(inicio | (nativo & (chave != anterior).to_numpy()))
+
+    # Herda só na primeira aparição do médico no bloco (nativa ou herdada)
+    primeira = ~pd.DataFrame({"b": bloco, "p": prest}).duplicated().to_numpy()
+    herda = ~nativo & (prest != "") & primeira
+    if not herda.any():
+        # Nada herdado: preserva os dtypes originais
+        return df
 
-                last_att, last_pac, last_av = curr_att, curr_pac, curr_av
-                if curr_prest != "":
-                    medicos_no_bloco.add(curr_prest)
-            else:
-                # Herdar uma única vez por médico dentro do bloco
-                if curr_prest != "" and curr_prest not in medicos_no_bloco:
-                    df.at[i, "Atendimento"] = last_att
-                    df.at[i, "Paciente"]    = last_pac
-                    df.at[i, "Aviso"]       = last_av
-                    medicos_no_bloco.add(curr_prest)
+    # Último registro nativo da mesma Data (antes de qualquer nativo, herda nulos)
+    pos = pd.Series(np.where(nativo, np.arange(len(order)), np.nan)).groupby(g).ffill().to_numpy()
+    alvo = np.flatnonzero(herda)
+    fonte = pos[alvo]
+    tem = ~np.isnan(fonte)
+    fonte_idx = fonte[tem].astype(np.intp)
+    for arr, sub in ((att_arr, att), (pac_arr, pac), (av_arr, av)):
+        vals = np.full(len(alvo), pd.NA, dtype=object)
+        vals[tem] = sub[fonte_idx]
+        arr[order[alvo]] = vals
+
+    df["Atendimento"] = att_arr
+    df["Paciente"]    = pac_arr
+    df["Aviso"]       = av_arr
 
     return df
 
@@ -292,6 +332,67 @@ def _diagnose_aviso_conflicts(df: pd.DataFrame) -> pd.DataFrame:
     ).reset_index(name="Avisos_Diferentes")
     return confl.merge(avisos, on=["Data", "Atendimento"], how="left")
 
+# =========================
+# Leitura de CSV
+# =========================
+
+_BOOL_TEXT = {"True": True, "TRUE": True, "true": True, "False": False, "FALSE": False, "false": False}
+
+# Mesmos marcadores de nulo do parser C do pandas (na_values padrão)
+_NA_TEXT = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+def _read_csv_fast(upload) -> pd.DataFrame:
+    """
+    CSV bem-formado via parser do PyArrow (C++ multithread). Todas as colunas do cabeçalho são
+    lidas como texto (sem a inferência do Arrow, que transformaria "08:30" em time32) e depois
+    tipadas como o parser C faria (numérico -> int64/float64, True/False -> bool, resto object),
+    para que Data/Hora_Inicio/ids e os dtypes de saída não mudem.
+    Sem pyarrow instalado (ou se ele recusar o arquivo), repete com o parser C padrão.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        raw = upload.read()
+        header = next(csv.reader([raw.split(b"\n", 1)[0].decode("utf-8-sig").rstrip("\r")]))
+        table = pacsv.read_csv(
+            pa.BufferReader(raw),
+            parse_options=pacsv.ParseOptions(delimiter=",", newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={n: pa.string() for n in header},
+                null_values=_NA_TEXT,
+                strings_can_be_null=True,
+            ),
+        )
+        if table.num_columns != len(set(header)):
+            raise ValueError("cabeçalho com nomes repetidos")
+        df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    except Exception:
+        upload.seek(0)
+        return pd.read_csv(upload, sep=",", encoding="utf-8")
+
+    for c in df.columns:
+        col = df[c]
+        if col.isna().all():
+            df[c] = col.to_numpy(dtype="float64", na_value=np.nan) if len(col) else col.astype(object)
+            continue
+        try:
+            num = pd.to_numeric(col)
+        except (ValueError, TypeError):
+            if not col.isna().any() and col.isin(list(_BOOL_TEXT)).all():
+                df[c] = col.map(_BOOL_TEXT).astype(bool)
+            else:
+                df[c] = col.to_numpy(dtype=object, na_value=np.nan)
+            continue
+        if pd.api.types.is_integer_dtype(num.dtype) and not num.isna().any():
+            df[c] = num.astype("int64")
+        else:
+            df[c] = num.to_numpy(dtype="float64", na_value=np.nan)
+    return df
+
 # =========================
 # Pipeline principal
 # =========================
@@ -307,7 +408,7 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
     name = getattr(upload, "name", "").lower()
     if name.endswith(".csv"):
         try:
-            df_in = pd.read_csv(upload, sep=",", encoding="utf-8")
+            df_in = _read_csv_fast(upload)
             if len(set(EXPECTED_COLS) & set(df_in.columns)) < 6:
                 upload.seek(0)
                 text = upload.read().decode("utf-8", errors="ignore")
@@ -332,7 +433,7 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
 
     # 4) Filtro de prestadores escolhidos (case/acentos insensitive)
     target = [_strip_accents(p).strip().upper() for p in prestadores_lista]
-    df["Prestador_norm"] = df["Prestador"].apply(lambda x: _strip_accents(x).strip().upper())
+    df["Prestador_norm"] = _norm_upper_noacc(df["Prestador"])
     df = df[df["Prestador_norm"].isin(target)].copy()
 
     # 5) Remover linhas sem nenhum dos 3 pilares (Atendimento/Paciente/Aviso)
@@ -345,15 +446,17 @@ def process_uploaded_file(upload, prestadores_lista, selected_hospital: str):
     # 7) Normaliza/resolve 'Aviso' e deduplica por (Data, Prestador, Atendimento)
     df = _normalize_and_resolve_aviso_conflicts(df)
 
+    # Deduplicação prática p/ "Pacientes únicos por dia e prestador".
+    # Antes de ordenar: o frame ainda está na ordem original (_row_idx) e duplicatas têm a mesma
+    # Data, então keep="first" escolhe a mesma linha; a ordenação roda só sobre o que sobrou
+    df = df.drop_duplicates(subset=["Data", "Prestador", "Atendimento"], keep="first")
+
     # Ordenação estável pela ordem original do arquivo
     if "_row_idx" in df.columns:
         df = df.sort_values(["Ano", "Mes", "Dia", "_row_idx"], kind="mergesort")
     else:
         df = df.sort_values(["Ano", "Mes", "Dia"], kind="mergesort")
 
-    # Deduplicação prática p/ "Pacientes únicos por dia e prestador"
-    df = df.drop_duplicates(subset=["Data", "Prestador", "Atendimento"], keep="first")
-
     # 8) Seleção de colunas finais
     cols_to_return = [
         "Hospital", "Ano", "Mes", "Dia", "Data",
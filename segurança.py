@@ -2,12 +2,21 @@
 # -*- coding: utf-8 -*-
 import os
 from datetime import datetime
+from io import BytesIO
 import pandas as pd
 import streamlit as st
 
-from db import init_db, upsert_dataframe, read_all, DB_PATH, count_all
+from db import (
+    init_db, upsert_dataframe, read_all, DB_PATH, count_all,
+    vacuum, dispose_engine, reset_db_file,
+    delete_all_pacientes, delete_all_cirurgias, delete_all_catalogos,
+    find_registros_para_prefill, list_registros_base_all,
+    insert_or_update_cirurgia, list_cirurgias, delete_cirurgia,
+    list_procedimento_tipos, upsert_procedimento_tipo, set_procedimento_tipo_status,
+    list_cirurgia_situacoes, upsert_cirurgia_situacao, set_cirurgia_situacao_status,
+)
 from processing import process_uploaded_file
-from export import to_formatted_excel_by_hospital
+from export import to_formatted_excel_by_hospital, to_formatted_excel_cirurgias
 
 # --- GitHub sync (baixar/subir o .db) ---
 try:
@@ -107,7 +116,6 @@ with st.sidebar:
     with col_r1:
         if st.button("Apagar **PACIENTES** (tabela base)", type="secondary", disabled=not can_execute):
             try:
-                from db import delete_all_pacientes, vacuum
                 apagados = delete_all_pacientes()
                 vacuum()
                 st.success(f"✅ {apagados} paciente(s) apagado(s) do banco.")
@@ -120,7 +128,6 @@ with st.sidebar:
     with col_r2:
         if st.button("Apagar **CIRURGIAS**", type="secondary", disabled=not can_execute):
             try:
-                from db import delete_all_cirurgias, vacuum
                 apagadas = delete_all_cirurgias()  # retorna quantas foram removidas
                 vacuum()
                 st.session_state.pop("editor_lista_cirurgias_union", None)  # limpa cache do grid
@@ -135,7 +142,6 @@ with st.sidebar:
     with col_r3:
         if st.button("Apagar **CATÁLOGOS** (Tipos/Situações)", type="secondary", disabled=not can_execute):
             try:
-                from db import delete_all_catalogos, vacuum
                 apagados = delete_all_catalogos()
                 vacuum()
                 st.success(f"✅ {apagados} registro(s) apagado(s) dos catálogos.")
@@ -148,7 +154,6 @@ with st.sidebar:
     with col_r4:
         if st.button("🗑️ **RESET TOTAL** (apaga arquivo .db)", type="primary", disabled=not can_execute):
             try:
-                from db import dispose_engine, reset_db_file
                 dispose_engine()
                 reset_db_file()
                 st.success("Banco recriado vazio.")
@@ -344,17 +349,6 @@ with tabs[0]:
 # ====================================================================================
 with tabs[1]:
     st.subheader("Cadastrar / Editar Cirurgias (compartilha o mesmo banco)")
-    from db import (
-        find_registros_para_prefill,
-        insert_or_update_cirurgia,
-        list_procedimento_tipos,
-        list_cirurgia_situacoes,
-        list_cirurgias,
-        delete_cirurgia,
-        list_registros_base_all
-    )
-    from export import to_formatted_excel_cirurgias
-
     # Filtros principais
     st.markdown("#### Filtros para carregar pacientes na Lista de Cirurgias")
     colF0, colF1, colF2, colF3 = st.columns([1, 1, 1, 1])
@@ -398,7 +392,7 @@ with tabs[1]:
 
     # -------- Carregar catálogos (para dropdowns do grid) --------
     tipos_rows = list_procedimento_tipos(only_active=True)
-    df_tipos_cat = pd.DataFrame(tipos_rows, columns=["id", "nome", "ativo", "ordem"]) if tipos_rows else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+    df_tipos_cat = tipos_rows
     if not df_tipos_cat.empty:
         df_tipos_cat = df_tipos_cat.sort_values(["ordem", "nome"], kind="mergesort")
         tipo_nome_list = df_tipos_cat["nome"].tolist()
@@ -410,7 +404,7 @@ with tabs[1]:
         tipo_id2nome = {}
 
     sits_rows = list_cirurgia_situacoes(only_active=True)
-    df_sits_cat = pd.DataFrame(sits_rows, columns=["id", "nome", "ativo", "ordem"]) if sits_rows else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+    df_sits_cat = sits_rows
     if not df_sits_cat.empty:
         df_sits_cat = df_sits_cat.sort_values(["ordem", "nome"], kind="mergesort")
         sit_nome_list = df_sits_cat["nome"].tolist()
@@ -508,7 +502,7 @@ with tabs[1]:
             "Fatura": ["" for _ in range(len(df_base))],
             "Observacoes": ["" for _ in range(len(df_base))],
             "created_at": [None]*len(df_base),
-            "updated_at": [None]*len(df_base],
+            "updated_at": [None]*len(df_base),
             "Fonte": ["Base"]*len(df_base),
             "Tipo (nome)": ["" for _ in range(len(df_base))],  # edição por nome
             "Situação (nome)": ["" for _ in range(len(df_base))]  # edição por nome
@@ -710,7 +704,6 @@ with tabs[1]:
         with colG2:
             if st.button("⬇️ Exportar Excel (Lista atual)"):
                 try:
-                    from export import to_formatted_excel_cirurgias
                     export_df = edited_df.drop(columns=["Tipo (nome)", "Situação (nome)"], errors="ignore")
                     export_df = pd.DataFrame(export_df)
                     excel_bytes = to_formatted_excel_cirurgias(export_df)
@@ -777,14 +770,10 @@ with tabs[2]:
     if "tipo_bulk_reset" not in st.session_state:
         st.session_state["tipo_bulk_reset"] = 0
 
-    from db import list_procedimento_tipos
     df_tipos_cached = st.session_state.get("df_tipos_cached")
     if df_tipos_cached is None:
         tipos_all = list_procedimento_tipos(only_active=False)
-        if tipos_all:
-            df_tipos_cached = pd.DataFrame(tipos_all, columns=["id", "nome", "ativo", "ordem"])
-        else:
-            df_tipos_cached = pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+        df_tipos_cached = tipos_all
         st.session_state["df_tipos_cached"] = df_tipos_cached
 
     def _next_ordem_from_cache(df: pd.DataFrame) -> int:
@@ -824,12 +813,11 @@ with tabs[2]:
             tipo_ordem = int(st.session_state.get(f"tipo_ordem_input_{suffix}", next_tipo_ordem))
             tipo_ativo = bool(st.session_state.get(f"tipo_ativo_input_{suffix}", True))
 
-            from db import upsert_procedimento_tipo, list_procedimento_tipos
             tid = upsert_procedimento_tipo(tipo_nome, int(tipo_ativo), int(tipo_ordem))
             st.success(f"Tipo salvo (id={tid}).")
 
             tipos_all2 = list_procedimento_tipos(only_active=False)
-            df2 = pd.DataFrame(tipos_all2, columns=["id", "nome", "ativo", "ordem"]) if tipos_all2 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+            df2 = tipos_all2
             st.session_state["df_tipos_cached"] = df2
 
             prox_id = (df2["id"].max() + 1) if not df2.empty else 1
@@ -869,7 +857,6 @@ with tabs[2]:
                     st.warning("Nada a cadastrar: informe ao menos um nome de tipo.")
                     return
 
-                from db import upsert_procedimento_tipo, list_procedimento_tipos
                 num_new, num_skip = 0, 0
                 vistos = set()
                 for i, nome in enumerate(nomes):
@@ -884,7 +871,7 @@ with tabs[2]:
                         num_skip += 1
 
                 tipos_all3 = list_procedimento_tipos(only_active=False)
-                df3 = pd.DataFrame(tipos_all3, columns=["id", "nome", "ativo", "ordem"]) if tipos_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+                df3 = tipos_all3
                 st.session_state["df_tipos_cached"] = df3
 
                 st.success(f"Cadastro em lote concluído. Criados/atualizados: {num_new} | ignorados: {num_skip}")
@@ -908,14 +895,13 @@ with tabs[2]:
             if st.button("🔄 Recarregar catálogos de Tipos"):
                 try:
                     tipos_allX = list_procedimento_tipos(only_active=False)
-                    dfX = pd.DataFrame(tipos_allX, columns=["id", "nome", "ativo", "ordem"]) if tipos_allX else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+                    dfX = tipos_allX
                     st.session_state["df_tipos_cached"] = dfX
                     st.success("Tipos recarregados com sucesso.")
                 except Exception as e:
                     st.error("Falha ao recarregar tipos.")
                     st.exception(e)
 
-        from db import set_procedimento_tipo_status
         try:
             df_tipos = st.session_state.get("df_tipos_cached", pd.DataFrame(columns=["id", "nome", "ativo", "ordem"]))
             if not df_tipos.empty:
@@ -932,12 +918,12 @@ with tabs[2]:
                 )
                 if st.button("Aplicar alterações nos tipos"):
                     try:
-                        for _, r in df_tipos.iterrows():
-                            set_procedimento_tipo_status(int(r["id"]), int(r["ativo"]))
+                        for rid, ativo in df_tipos[["id", "ativo"]].itertuples(index=False, name=None):
+                            set_procedimento_tipo_status(int(rid), int(ativo))
                         st.success("Tipos atualizados.")
 
                         tipos_all3 = list_procedimento_tipos(only_active=False)
-                        df3 = pd.DataFrame(tipos_all3, columns=["id", "nome", "ativo", "ordem"]) if tipos_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+                        df3 = tipos_all3
                         st.session_state["df_tipos_cached"] = df3
 
                         prox_id = (df3["id"].max() + 1) if not df3.empty else 1
@@ -960,14 +946,10 @@ with tabs[2]:
     if "sit_form_reset" not in st.session_state:
         st.session_state["sit_form_reset"] = 0
 
-    from db import list_cirurgia_situacoes
     df_sits_cached = st.session_state.get("df_sits_cached")
     if df_sits_cached is None:
         sits_all = list_cirurgia_situacoes(only_active=False)
-        if sits_all:
-            df_sits_cached = pd.DataFrame(sits_all, columns=["id", "nome", "ativo", "ordem"])
-        else:
-            df_sits_cached = pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+        df_sits_cached = sits_all
         st.session_state["df_sits_cached"] = df_sits_cached
 
     def _next_sit_ordem_from_cache(df: pd.DataFrame) -> int:
@@ -1007,12 +989,11 @@ with tabs[2]:
             sit_ordem = int(st.session_state.get(f"sit_ordem_input_{suffix}", next_sit_ordem))
             sit_ativo = bool(st.session_state.get(f"sit_ativo_input_{suffix}", True))
 
-            from db import upsert_cirurgia_situacao, list_cirurgia_situacoes
             sid = upsert_cirurgia_situacao(sit_nome, int(sit_ativo), int(sit_ordem))
             st.success(f"Situação salva (id={sid}).")
 
             sits_all2 = list_cirurgia_situacoes(only_active=False)
-            df2 = pd.DataFrame(sits_all2, columns=["id", "nome", "ativo", "ordem"]) if sits_all2 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+            df2 = sits_all2
             st.session_state["df_sits_cached"] = df2
 
             prox_id_s = (df2["id"].max() + 1) if not df2.empty else 1
@@ -1039,14 +1020,13 @@ with tabs[2]:
             if st.button("🔄 Recarregar catálogos de Situações"):
                 try:
                     sits_allX = list_cirurgia_situacoes(only_active=False)
-                    dfX = pd.DataFrame(sits_allX, columns=["id", "nome", "ativo", "ordem"]) if sits_allX else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+                    dfX = sits_allX
                     st.session_state["df_sits_cached"] = dfX
                     st.success("Situações recarregadas com sucesso.")
                 except Exception as e:
                     st.error("Falha ao recarregar situações.")
                     st.exception(e)
 
-        from db import set_cirurgia_situacao_status
         try:
             df_sits = st.session_state.get("df_sits_cached", pd.DataFrame(columns=["id", "nome", "ativo", "ordem"]))
             if not df_sits.empty:
@@ -1063,12 +1043,12 @@ with tabs[2]:
                 )
                 if st.button("Aplicar alterações nas situações"):
                     try:
-                        for _, r in df_sits.iterrows():
-                            set_cirurgia_situacao_status(int(r["id"]), int(r["ativo"]))
+                        for rid, ativo in df_sits[["id", "ativo"]].itertuples(index=False, name=None):
+                            set_cirurgia_situacao_status(int(rid), int(ativo))
                         st.success("Situações atualizadas.")
 
                         sits_all3 = list_cirurgia_situacoes(only_active=False)
-                        df3 = pd.DataFrame(sits_all3, columns=["id", "nome", "ativo", "ordem"]) if sits_all3 else pd.DataFrame(columns=["id", "nome", "ativo", "ordem"])
+                        df3 = sits_all3
                         st.session_state["df_sits_cached"] = df3
 
                         prox_id_s = (df3["id"].max() + 1) if not df3.empty else 1
@@ -1091,11 +1071,9 @@ with tabs[3]:
     st.subheader("Lista de Tipos de Procedimento")
     st.caption("Visualize, filtre, busque, ordene e exporte todos os tipos (ativos e inativos).")
 
-    from db import list_procedimento_tipos
-
     try:
         tipos_all = list_procedimento_tipos(only_active=False)
-        df_tipos_full = pd.DataFrame(tipos_all, columns=["id", "nome", "ativo", "ordem"])
+        df_tipos_full = tipos_all
     except Exception as e:
         st.error("Erro ao carregar tipos do banco.")
         st.exception(e)
@@ -1124,11 +1102,12 @@ with tabs[3]:
     st.divider()
     st.markdown("#### Resultado")
     total_rows = len(df_view)
-    per_page = st.number_input("Linhas por página", min_value=10, max_value=200, value=25, step=5)
-    max_page = max(1, (total_rows + per_page - 1) // per_page)
-    page = st.number_input("Página", min_value=1, max_value=max_page, value=1, step=1)
-    start, end = (page - 1) * per_page, (page - 1) * per_page + per_page
-    df_page = df_view.iloc[start:end].copy()
+    per_page = int(st.number_input("Linhas por página", min_value=10, max_value=200, value=25, step=5))
+    max_page = max(1, -(-total_rows // per_page))
+    page = int(st.number_input("Página", min_value=1, max_value=max_page, value=1, step=1))
+    start = (page - 1) * per_page
+    # Fatia sem cópia: st.dataframe só lê df_page
+    df_page = df_view.iloc[start:start + per_page]
     st.caption(f"Exibindo {len(df_page)} de {total_rows} registro(s) — página {page}/{max_page}")
     st.dataframe(df_page, use_container_width=True)
 
@@ -1144,7 +1123,6 @@ with tabs[3]:
         )
     with colE2:
         try:
-            from io import BytesIO
             output = BytesIO()
             with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
                 df_view.to_excel(writer, sheet_name="Tipos", index=False)